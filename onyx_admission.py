@@ -0,0 +1,275 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# ----- ADMISSION CONTROL AND LOAD SHEDDING -------------------------
+# Every prediction path asks for a slot before touching a model. At most
+# `max_concurrent` predictions run at once. Requests that cannot start right
+# away wait in a bounded priority queue where interactive predictions always
+# go before batch work, and batch work may only hold `batch_slots` of the
+# slots. Each client also has a token bucket. A request is shed immediately
+# when its client is over rate or the queue is full, and after a short wait
+# when no slot frees up in time, so under a spike users get a clear "busy"
+# answer instead of an ever-growing queue.
+
+INTERACTIVE, BATCH = 0, 1
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = clients connect directly)
+TRUSTED_PROXY_HOPS = int(os.environ.get('ONYX_TRUSTED_PROXY_HOPS', 0))
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+SHED_MESSAGES = {
+    'rate_limited': "You are sending requests faster than this server allows.",
+    'queue_full': "The server is at capacity.",
+    'timeout': "The server is busy and no slot became free in time.",
+    'preempted': "Batch work was pushed back to make room for interactive predictions.",
+}
+
+
+class Rejected(Exception):
+    """Raised when a request is shed; retry_after is a suggested delay in seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(SHED_MESSAGES[reason])
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now, cost=1.0):
+        """Takes cost tokens and returns 0, or returns the seconds until they are available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'admitted', 'reason')
+
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.seq = seq
+        self.admitted = False
+        self.reason = None  # set when the waiter is shed while queued
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Slot:
+    """A granted execution slot; release it (or leave the with-block) when the prediction is done."""
+
+    def __init__(self, controller, priority):
+        self._controller = controller
+        self.priority = priority
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self.priority)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """Bounded concurrency, a bounded priority queue and per-client rate limits for predictions."""
+
+    def __init__(self, max_concurrent=None, max_queue=32, batch_slots=None, client_rate=5.0,
+                 client_burst=10, queue_timeout=2.0, batch_timeout=10.0, max_clients=10000):
+        self.max_concurrent = max_concurrent or os.cpu_count() or 4
+        self.max_queue = max_queue
+        self.batch_slots = batch_slots or max(1, self.max_concurrent // 2)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.timeouts = {INTERACTIVE: queue_timeout, BATCH: batch_timeout}
+        self.max_clients = max_clients
+        self._cond = threading.Condition()
+        self._buckets = OrderedDict()  # client -> TokenBucket, least recently seen first
+        self._heap = []
+        self._seq = itertools.count()
+        self._waiting = Counter()  # priority -> live queued waiters
+        self._running = Counter()  # priority -> granted slots
+        self.admitted = Counter()
+        self.shed = Counter()  # (priority name, reason) -> count
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_queue = 0
+
+    def acquire(self, client, priority=INTERACTIVE, cost=1.0):
+        """Returns a Slot, waiting briefly if needed, or raises Rejected."""
+        start = time.monotonic()
+        with self._cond:
+            retry_after = self._bucket(client, start).take(start, cost)
+            if retry_after:
+                raise self._shed(priority, 'rate_limited', retry_after)
+
+            if not self._queued_ahead(priority) and self._can_run(priority):
+                return self._grant(priority, start)
+
+            if sum(self._waiting.values()) >= self.max_queue and not self._preempt_batch(priority):
+                raise self._shed(priority, 'queue_full', self._retry_estimate())
+
+            waiter = _Waiter(priority, next(self._seq))
+            heapq.heappush(self._heap, waiter)
+            self._waiting[priority] += 1
+            self.peak_queue = max(self.peak_queue, sum(self._waiting.values()))
+
+            deadline = start + self.timeouts[priority]
+            while not waiter.admitted and waiter.reason is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    waiter.reason = 'timeout'
+                    self._waiting[priority] -= 1
+                    break
+                self._cond.wait(remaining)
+
+            if waiter.admitted:
+                return self._grant(priority, start, counted=True)
+            # The waiter stays in the heap; _dispatch() discards shed entries lazily
+            raise self._shed(priority, waiter.reason, self._retry_estimate())
+
+    def reserve(self, priority, count):
+        """Takes up to count more slots that are free right now, without queueing or rate limiting.
+
+        For a request that fans out to several worker processes: the caller
+        already holds one slot from acquire(), and each extra process needs one
+        of these, so the fan-out never exceeds the concurrency bound.
+        """
+        slots = []
+        with self._cond:
+            while len(slots) < count and not self._queued_ahead(priority) and self._can_run(priority):
+                self._running[priority] += 1
+                slots.append(Slot(self, priority))
+        return slots
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': sum(self._running.values()),
+                'queued': sum(self._waiting.values()),
+                'peak_queue': self.peak_queue,
+                'clients': len(self._buckets),
+                'mean_wait_ms': 1000 * self.wait_seconds / max(sum(self.admitted.values()), 1),
+                'max_wait_ms': 1000 * self.max_wait_seconds,
+            }
+            for name in PRIORITY_NAMES.values():
+                stats[f'{name}_admitted'] = self.admitted[name]
+            for (name, reason), count in sorted(self.shed.items()):
+                stats[f'{name}_shed_{reason}'] = count
+            stats['shed_total'] = sum(self.shed.values())
+            return stats
+
+    def _bucket(self, client, now):
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.client_rate, self.client_burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def _queued_ahead(self, priority):
+        return any(self._waiting[p] for p in PRIORITY_NAMES if p <= priority)
+
+    def _can_run(self, priority):
+        if sum(self._running.values()) >= self.max_concurrent:
+            return False
+        return priority == INTERACTIVE or self._running[BATCH] < self.batch_slots
+
+    def _grant(self, priority, start, counted=False):
+        if not counted:
+            self._running[priority] += 1
+        waited = time.monotonic() - start
+        self.admitted[PRIORITY_NAMES[priority]] += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return Slot(self, priority)
+
+    def _release(self, priority):
+        with self._cond:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        # Hands free slots to the queue head: interactive first, then batch, FIFO within each
+        granted = False
+        while self._heap:
+            head = self._heap[0]
+            if head.reason is not None:
+                heapq.heappop(self._heap)
+                continue
+            if not self._can_run(head.priority):
+                break
+            heapq.heappop(self._heap)
+            self._waiting[head.priority] -= 1
+            # The slot is counted here so no newcomer can take it before the waiter wakes up
+            self._running[head.priority] += 1
+            head.admitted = True
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _preempt_batch(self, priority):
+        """Makes room for an interactive request by shedding the newest queued batch request."""
+        if priority != INTERACTIVE or not self._waiting[BATCH]:
+            return False
+        newest = max((w for w in self._heap if w.priority == BATCH and w.reason is None), key=lambda w: w.seq)
+        newest.reason = 'preempted'
+        self._waiting[BATCH] -= 1
+        self._cond.notify_all()
+        return True
+
+    def _retry_estimate(self):
+        # Rough guess: one queue timeout, scaled by how full the queue is
+        return self.timeouts[INTERACTIVE] * (1 + sum(self._waiting.values()) / max(self.max_queue, 1))
+
+    def _shed(self, priority, reason, retry_after):
+        self.shed[(PRIORITY_NAMES[priority], reason)] += 1
+        return Rejected(reason, retry_after)
+
+
+def client_address(peer, forwarded_for='', trusted_hops=TRUSTED_PROXY_HOPS):
+    """The address a rate limit should key on.
+
+    Clients can write anything into X-Forwarded-For, so only the entries the
+    trusted proxies appended count: with N hops the client is the Nth entry
+    from the right. With no trusted proxies the header is ignored.
+    """
+    if trusted_hops > 0:
+        hops = [entry.strip() for entry in forwarded_for.split(',') if entry.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return peer or 'local'
+
+
+def create_admission_controller():
+    """Builds the process-wide controller; every limit can be overridden through ONYX_* variables."""
+    max_concurrent = int(os.environ.get('ONYX_MAX_CONCURRENT', 0)) or None
+    return AdmissionController(
+        max_concurrent=max_concurrent,
+        max_queue=int(os.environ.get('ONYX_MAX_QUEUE', 32)),
+        client_rate=float(os.environ.get('ONYX_CLIENT_RATE', 5.0)),
+        client_burst=float(os.environ.get('ONYX_CLIENT_BURST', 10)),
+    )
@@ -0,0 +1,33 @@
+"""Serves all three apps from one Streamlit process.
+
+`streamlit run onyx_apps.py` puts onyx_regression_app.py, v1_app.py and
+v2_app.py behind one st.navigation menu. Every page calls run_app() in this
+process, so they share the resources load_resources() caches with
+st.cache_resource: one model registry, one online learner, one drift monitor
+and one admission controller. Running the three files with separate
+`streamlit run` commands still works, but each process then holds its own
+copy of everything.
+"""
+import streamlit as st
+
+import onyx_regression_app
+import v1_app
+import v2_app
+from onyx_core import run_app
+
+# (title, URL path, config); the first entry is the landing page
+APPS = [
+    ("Regressify Pro", "pro", onyx_regression_app.CONFIG),
+    ("Regressify V1", "v1", v1_app.CONFIG),
+    ("Regressify V2", "v2", v2_app.CONFIG),
+]
+
+
+def app_page(title, url_path, config):
+    def render():
+        run_app(config)
+    render.__name__ = f"render_{url_path}"
+    return st.Page(render, title=title, url_path=url_path, default=url_path == APPS[0][1])
+
+
+st.navigation([app_page(*app) for app in APPS], position="top").run()
@@ -0,0 +1,328 @@
+"""Reduced-precision, cache-blocked bulk scoring for very large input files.
+
+The models are tiny, so large scoring runs are bound by memory traffic, not
+arithmetic. This mode converts the inputs to float32 once, skips the sklearn
+and PolynomialFeatures intermediates, and scores fixed-size row blocks into a
+preallocated output so each block's working set stays in cache:
+
+- simple:     y = x * slope + intercept
+- polynomial: Horner's rule on the collapsed power series; multi-feature
+              transformers expand their power terms block by block
+- multiple:   numeric block @ coefficients plus a gathered location coefficient
+
+The block size is picked by one calibration run over cache-sized candidates,
+unless --block-rows is given. The file is read and scored in chunks of
+--chunk-rows rows, so only one chunk of inputs is in memory at a time. A random
+sample of --check-rows rows per chunk is also scored from the original inputs
+in float64, and the largest deviation is reported, covering both input rounding
+and float32 arithmetic. A sample's maximum is only a lower bound, so --full-check
+compares every row, and --tolerance always does: the exit status is 1 when any
+row's deviation exceeds it.
+
+Inputs use the onyx_stream.py field names (hours, level, or location plus
+rd, admin, marketing) as CSV or Parquet columns.
+
+Usage:
+    python onyx_bulk.py inputs.csv --model multiple --output predictions.npy --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from onyx_encoding import load_indexed_multiple
+from onyx_evaluation import iter_chunks
+from onyx_goalseek import polynomial_coefficients
+from onyx_models import MODEL_NAMES, MULTIPLE_SCHEMA, load_models, model_available
+
+DEFAULT_CACHE_BYTES = 1024 * 1024
+CALIBRATION_ROWS = 1 << 20
+CHUNK_ROWS = 1 << 20
+CHECK_ROWS = 4096
+
+# (model name, dtype) -> block rows chosen by calibration, kept for the life of the process
+_calibrated = {}
+
+
+def cache_bytes():
+    """Size of the per-core L2 cache, read from sysfs where available."""
+    try:
+        with open('/sys/devices/system/cpu/cpu0/cache/index2/size') as f:
+            size = f.read().strip().upper()
+        scale = {'K': 1024, 'M': 1024 * 1024}.get(size[-1], 1)
+        return int(size.rstrip('KM')) * scale
+    except (OSError, ValueError):
+        return DEFAULT_CACHE_BYTES
+
+
+class BulkKernel:
+    """Blocked scorer for one model, with its coefficients cast to `dtype` once."""
+
+    def __init__(self, name, models, dtype=np.float32):
+        if name not in MODEL_NAMES or not model_available(models, name):
+            raise ValueError(f"Model '{name}' is not available")
+        self.name = name
+        self.dtype = np.dtype(dtype)
+
+        if name == 'simple':
+            model = models['simple']
+            self.columns = ['hours']
+            self.slope = self.dtype.type(np.ravel(model.coef_)[0])
+            self.intercept = self.dtype.type(model.intercept_)
+        elif name == 'polynomial':
+            transformer = models['poly_transformer']
+            self.powers = np.asarray(transformer.powers_)
+            if self.powers.shape[1] == 1:
+                self.columns = ['level']
+                # Highest power first, the order Horner's rule consumes them in
+                self.series = polynomial_coefficients(transformer, models['poly_lin_reg'])[::-1].astype(self.dtype)
+            else:
+                self.columns = list(getattr(transformer, 'feature_names_in_', []))
+                if len(self.columns) != self.powers.shape[1]:
+                    raise ValueError("Multi-feature polynomial models need fitted feature names")
+                self.series = None
+                self.coef = np.ravel(models['poly_lin_reg'].coef_).astype(self.dtype)
+                self.intercept = self.dtype.type(models['poly_lin_reg'].intercept_)
+        else:
+            profit_model = load_indexed_multiple(models)
+            self.profit_model = profit_model
+            self.columns = [MULTIPLE_SCHEMA['categorical']] + profit_model.numeric
+            self.numeric_coef = profit_model.numeric_coef.astype(self.dtype)
+            self.category_coef = profit_model.category_coef.astype(self.dtype)
+            self.intercept = self.dtype.type(profit_model.intercept)
+
+    @property
+    def bytes_per_row(self):
+        """Working-set bytes per row of a block: inputs, output and any scratch."""
+        width = len(self.columns)
+        if self.name == 'polynomial' and self.series is None:
+            width += len(self.powers)
+        return (width + 1) * self.dtype.itemsize
+
+    def prepare(self, frame):
+        """Converts an input frame to the kernel's arrays: (location index, numeric) or (x,)."""
+        missing = [column for column in self.columns if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing input column(s): {', '.join(missing)}")
+        if self.name == 'multiple':
+            location_idx = self.profit_model.category_index(frame[self.columns[0]])
+            numeric = frame[self.columns[1:]].to_numpy(dtype=self.dtype)
+            return location_idx, np.ascontiguousarray(numeric)
+        values = frame[self.columns].to_numpy(dtype=self.dtype)
+        return (np.ascontiguousarray(values[:, 0] if values.shape[1] == 1 else values),)
+
+    def score_block(self, arrays, out):
+        """Writes one block's predictions into out without temporaries the size of the input."""
+        if self.name == 'simple':
+            (x,) = arrays
+            np.multiply(x, self.slope, out=out)
+            out += self.intercept
+        elif self.name == 'polynomial' and self.series is not None:
+            (x,) = arrays
+            out.fill(self.series[0])
+            for c in self.series[1:]:
+                out *= x
+                out += c
+        elif self.name == 'polynomial':
+            (x,) = arrays
+            terms = np.prod(x[:, None, :] ** self.powers.astype(self.dtype)[None, :, :], axis=2)
+            np.matmul(terms, self.coef, out=out)
+            out += self.intercept
+        else:
+            location_idx, numeric = arrays
+            np.matmul(numeric, self.numeric_coef, out=out)
+            out += self.category_coef[location_idx]
+            out += self.intercept
+            out[location_idx < 0] = np.nan
+
+    def score(self, arrays, block_rows):
+        """Scores every row block by block into one preallocated output array."""
+        n = len(arrays[0])
+        out = np.empty(n, dtype=self.dtype)
+        for start in range(0, n, block_rows):
+            stop = min(start + block_rows, n)
+            self.score_block(tuple(a[start:stop] for a in arrays), out[start:stop])
+        return out
+
+    def block_candidates(self):
+        """Power-of-two block sizes whose working set spans 1/16 to 2x the L2 cache."""
+        cache = cache_bytes()
+        low = max(cache // 16 // self.bytes_per_row, 256)
+        high = max(2 * cache // self.bytes_per_row, low)
+        return [1 << k for k in range(int(low).bit_length() - 1, int(high).bit_length())]
+
+    def calibrate(self, arrays):
+        """Times every candidate block size once on a sample and keeps the fastest.
+
+        Candidates larger than the sample would each time the same single block,
+        so they are skipped; returns None when fewer than two candidates fit.
+        Only a calibration that covered every candidate is kept for later runs.
+        """
+        key = (self.name, self.dtype.str)
+        if key not in _calibrated:
+            sample = tuple(a[:CALIBRATION_ROWS] for a in arrays)
+            candidates = self.block_candidates()
+            fitting = [block_rows for block_rows in candidates if block_rows <= len(sample[0])]
+            if len(fitting) < 2:
+                return None
+            self.score(sample, fitting[0])  # warm-up
+            timings = {}
+            for block_rows in fitting:
+                start = time.perf_counter()
+                self.score(sample, block_rows)
+                timings[block_rows] = time.perf_counter() - start
+            best = min(timings, key=timings.get)
+            if len(fitting) < len(candidates):
+                return best
+            _calibrated[key] = best
+        return _calibrated[key]
+
+
+class DeviationCheck:
+    """Largest |reduced - float64| over the rows compared so far."""
+
+    def __init__(self):
+        self.checked = 0
+        self.max_abs = float('nan')
+        self.max_rel = float('nan')
+        self.worst_row = None
+
+    def update(self, rows, predictions, exact):
+        deviation = np.abs(predictions.astype(np.float64) - exact)
+        valid = ~np.isnan(deviation)
+        self.checked += len(rows)
+        if not valid.any():
+            return
+        worst = int(np.argmax(np.where(valid, deviation, -1)))
+        if not deviation[worst] <= self.max_abs:  # also true while max_abs is still NaN
+            self.max_abs = float(deviation[worst])
+            self.worst_row = int(rows[worst])
+        relative = float(np.nanmax(deviation / np.maximum(np.abs(exact), 1.0)))
+        self.max_rel = relative if np.isnan(self.max_rel) else max(self.max_rel, relative)
+
+
+def bulk_score(name, models, chunks, block_rows=None, dtype=np.float32, check_rows=CHECK_ROWS, seed=0):
+    """Scores input frames in reduced precision and reports the deviation from float64.
+
+    chunks is an iterable of DataFrames (or a single DataFrame); only one is held
+    at a time besides the predictions. The float64 comparison rescores a random
+    sample of check_rows rows per chunk from the original inputs, so its maximum
+    deviation is only a lower bound; check_rows=None compares every row. The
+    report's deviation_check says which was done. Returns (predictions, report).
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    kernel = BulkKernel(name, models, dtype)
+    reference = BulkKernel(name, models, np.float64)
+    rng = np.random.default_rng(seed)
+    check = DeviationCheck()
+    parts = []
+    rows = 0
+    calibrated = block_rows is None
+    timings = {'read': 0.0, 'calibration': 0.0, 'score': 0.0, 'check': 0.0}
+
+    start = time.perf_counter()
+    for frame in chunks:
+        timings['read'] += time.perf_counter() - start
+        arrays = kernel.prepare(frame)
+
+        start = time.perf_counter()
+        if block_rows is None:
+            block_rows = kernel.calibrate(arrays)
+            if block_rows is None:
+                # Too few rows to tell block sizes apart: use the smallest cache-sized block
+                block_rows, calibrated = kernel.block_candidates()[0], False
+        timings['calibration'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictions = kernel.score(arrays, block_rows)
+        timings['score'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if check_rows is None or check_rows >= len(frame):
+            sample = np.arange(len(frame))
+        else:
+            sample = np.sort(rng.choice(len(frame), check_rows, replace=False))
+        if len(sample):
+            exact = reference.score(reference.prepare(frame.iloc[sample]), block_rows)
+            check.update(rows + sample, predictions[sample], exact)
+        timings['check'] += time.perf_counter() - start
+
+        parts.append(predictions)
+        rows += len(frame)
+        start = time.perf_counter()
+
+    predictions = np.concatenate(parts) if parts else np.empty(0, dtype=kernel.dtype)
+    invalid = int(np.isnan(predictions).sum())
+    report = {
+        'model': name,
+        'rows': len(predictions),
+        'invalid_rows': invalid,
+        'dtype': kernel.dtype.name,
+        'block_rows': block_rows,
+        'block_calibrated': calibrated,
+        'read_seconds': timings['read'],
+        'calibration_seconds': timings['calibration'],
+        'seconds': timings['score'],
+        'rows_per_second': len(predictions) / timings['score'] if timings['score'] else float('inf'),
+        'deviation_check': 'full' if check_rows is None else 'sampled',
+        'checked_rows': check.checked,
+        'check_seconds': timings['check'],
+        'max_abs_deviation': check.max_abs,
+        'max_rel_deviation': check.max_rel,
+        'worst_row': check.worst_row,
+    }
+    return predictions, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a large input file in float32, block by block.")
+    parser.add_argument('data', help="CSV or Parquet file of model inputs")
+    parser.add_argument('--model', choices=MODEL_NAMES, required=True)
+    parser.add_argument('--output', help="Write predictions to a .npy or .csv file")
+    parser.add_argument('--block-rows', type=int, default=None, help="Rows per block (default: calibrated)")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="Maximum allowed |float32 - float64|; compares every row, like --full-check")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read and scored per chunk")
+    parser.add_argument('--check-rows', type=int, default=CHECK_ROWS,
+                        help="Sampled rows per chunk compared with float64")
+    parser.add_argument('--full-check', action='store_true',
+                        help="Compare every row with float64 (default: a sample, which only bounds the deviation from below)")
+    args = parser.parse_args(argv)
+    if args.block_rows is not None and args.block_rows < 1:
+        parser.error("--block-rows must be positive")
+    if args.chunk_rows < 1 or args.check_rows < 1:
+        parser.error("--chunk-rows and --check-rows must be positive")
+    # A sample cannot show that every row is within tolerance, so the gate always compares all rows
+    full_check = args.full_check or args.tolerance is not None
+
+    models = load_models()
+    try:
+        columns = BulkKernel(args.model, models).columns
+        predictions, report = bulk_score(
+            args.model, models, iter_chunks(args.data, args.chunk_rows, columns), args.block_rows,
+            check_rows=None if full_check else args.check_rows
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        if args.output.endswith('.npy'):
+            np.save(args.output, predictions)
+        else:
+            pd.DataFrame({'prediction': predictions}).to_csv(args.output, index=False)
+        report['output'] = os.path.abspath(args.output)
+
+    # None when there is no gate, or no valid row to compare (the check was skipped, not failed)
+    checked = not np.isnan(report['max_abs_deviation'])
+    report['within_tolerance'] = (
+        bool(report['max_abs_deviation'] <= args.tolerance) if args.tolerance is not None and checked else None
+    )
+    print(json.dumps(report, indent=2))
+    return 1 if report['within_tolerance'] is False else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+"""Per-feature contribution breakdown of linear and polynomial predictions.
+
+Every prediction of these models is a sum of parts: the intercept plus
+coefficient x value for each input. For the multiple model the parts are the
+location (its gathered coefficient) and each spend. For the polynomial model
+they are the power terms level, level^2, ... A batch's whole contribution
+matrix comes from one broadcast multiply, and its rows sum to the
+predictions.
+
+Batches are processed in fixed-size chunks. ContributionSummary folds each
+chunk into running aggregates (mean, mean |contribution|, share, min, max),
+so a million rows never hold more than one chunk of contributions. The
+command line streams a CSV through the same chunks and optionally writes the
+per-row contributions:
+
+    python onyx_contributions.py inputs.csv --model multiple --output contributions.csv
+"""
+import argparse
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from onyx_encoding import load_indexed_multiple
+from onyx_models import MULTIPLE_SCHEMA, load_models, model_available
+
+CHUNK_ROWS = 65536
+
+
+def multiple_contributions(profit_model, location_idx, numeric):
+    """Returns (columns, matrix): intercept, location and coef x value per numeric feature.
+
+    Rows with an unknown location get NaN in the location column.
+    """
+    location_idx = np.asarray(location_idx, dtype=np.int64).ravel()
+    numeric = np.asarray(numeric, dtype=float).reshape(len(location_idx), len(profit_model.numeric))
+    matrix = np.empty((len(location_idx), 2 + len(profit_model.numeric)))
+    matrix[:, 0] = profit_model.intercept
+    matrix[:, 1] = np.where(location_idx >= 0, profit_model.category_coef[location_idx], np.nan)
+    np.multiply(numeric, profit_model.numeric_coef, out=matrix[:, 2:])
+    return ['intercept', profit_model.schema['categorical']] + profit_model.numeric, matrix
+
+
+def polynomial_terms(transformer, input_names=('level',)):
+    """Names of the non-bias power terms, e.g. level, level^2, ..."""
+    powers = np.asarray(transformer.powers_)
+    names = getattr(transformer, 'feature_names_in_', None)
+    names = transformer.get_feature_names_out(names if names is not None else list(input_names))
+    return [name for name, power in zip(names, powers) if power.any()]
+
+
+def polynomial_contributions(transformer, lin_reg, x, input_names=('level',)):
+    """Returns (columns, matrix): intercept plus coef x term for every power term.
+
+    The bias column's coefficient is folded into the intercept.
+    """
+    powers = np.asarray(transformer.powers_)
+    x = np.asarray(x, dtype=float).reshape(-1, powers.shape[1])
+    coef = np.ravel(lin_reg.coef_)
+    bias = ~powers.any(axis=1)
+    terms = powers[~bias]
+
+    matrix = np.empty((len(x), 1 + len(terms)))
+    matrix[:, 0] = float(lin_reg.intercept_) + coef[bias].sum()
+    if powers.shape[1] == 1:
+        np.power(x, terms[:, 0], out=matrix[:, 1:])
+    else:
+        matrix[:, 1:] = np.prod(x[:, None, :] ** terms[None, :, :], axis=2)
+    matrix[:, 1:] *= coef[~bias]
+    return ['intercept'] + polynomial_terms(transformer, input_names), matrix
+
+
+def frame_contributions(name, models, frame, schema=MULTIPLE_SCHEMA, profit_model=None):
+    """Contribution matrix for one frame of inputs (onyx_stream.py field names).
+
+    Chunked callers pass the multiple model's indexed view so it is built once.
+    """
+    if name == 'multiple':
+        if profit_model is None:
+            profit_model = load_indexed_multiple(models, schema)
+        location_idx = profit_model.category_index(frame[profit_model.schema['categorical']])
+        return multiple_contributions(profit_model, location_idx, frame[profit_model.numeric].to_numpy(dtype=float))
+    if name == 'polynomial':
+        transformer = models['poly_transformer']
+        input_names = list(getattr(transformer, 'feature_names_in_', ['level']))
+        return polynomial_contributions(transformer, models['poly_lin_reg'], frame[input_names].to_numpy(dtype=float))
+    raise ValueError(f"No contribution breakdown for model '{name}'")
+
+
+def iter_contributions(name, models, frame, schema=MULTIPLE_SCHEMA, chunk_rows=CHUNK_ROWS):
+    """Yields (columns, matrix) for consecutive row chunks of frame."""
+    if not model_available(models, name):
+        raise ValueError(f"Model '{name}' is not available")
+    profit_model = load_indexed_multiple(models, schema) if name == 'multiple' else None
+    for start in range(0, len(frame), chunk_rows):
+        yield frame_contributions(name, models, frame.iloc[start:start + chunk_rows], schema, profit_model)
+
+
+class ContributionSummary:
+    """Running per-column aggregates of contribution matrices, in O(columns) memory."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        width = len(self.columns)
+        self.count = 0
+        self.invalid = 0
+        self.total = np.zeros(width)
+        self.total_abs = np.zeros(width)
+        self.low = np.full(width, np.inf)
+        self.high = np.full(width, -np.inf)
+
+    def update(self, matrix):
+        valid = np.isfinite(matrix).all(axis=1)
+        self.invalid += int((~valid).sum())
+        matrix = matrix[valid]
+        self.count += len(matrix)
+        self.total += matrix.sum(axis=0)
+        self.total_abs += np.abs(matrix).sum(axis=0)
+        if len(matrix):
+            self.low = np.minimum(self.low, matrix.min(axis=0))
+            self.high = np.maximum(self.high, matrix.max(axis=0))
+
+    def to_frame(self):
+        """One row per contribution column; share is its part of the total mean |contribution|."""
+        count = max(self.count, 1)
+        mean_abs = self.total_abs / count
+        return pd.DataFrame({
+            'mean': self.total / count,
+            'mean_abs': mean_abs,
+            'share': mean_abs / mean_abs.sum() if mean_abs.sum() else np.nan,
+            'min': np.where(self.count, self.low, np.nan),
+            'max': np.where(self.count, self.high, np.nan),
+        }, index=pd.Index(self.columns, name='contribution'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Break predictions into per-feature contributions.")
+    parser.add_argument('data', help="CSV file of model inputs")
+    parser.add_argument('--model', choices=['multiple', 'polynomial'], required=True)
+    parser.add_argument('--output', help="Write per-row contributions and predictions to this CSV")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be positive")
+
+    models = load_models()
+    if not model_available(models, args.model):
+        parser.error(f"Model '{args.model}' is not available")
+
+    profit_model = load_indexed_multiple(models) if args.model == 'multiple' else None
+    summary = None
+    header = True
+    with open(args.output, 'w', newline='') if args.output else contextlib.nullcontext() as out:
+        for frame in pd.read_csv(args.data, chunksize=args.chunk_rows):
+            columns, matrix = frame_contributions(args.model, models, frame, profit_model=profit_model)
+            if summary is None:
+                summary = ContributionSummary(columns)
+            summary.update(matrix)
+            if out is not None:
+                chunk = pd.DataFrame(matrix, columns=columns)
+                chunk['prediction'] = matrix.sum(axis=1)
+                chunk.to_csv(out, header=header, index=False)
+                header = False
+
+    if summary is None:
+        parser.error("No input rows")
+    print(summary.to_frame().to_string(float_format=lambda v: f"{v:,.4g}"))
+    print(f"\n{summary.count:,} rows summarized, {summary.invalid:,} skipped as invalid")
+
+
+if __name__ == '__main__':
+    main()
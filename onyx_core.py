@@ -0,0 +1,1117 @@
+"""Shared core behind onyx_regression_app.py, v1_app.py and v2_app.py.
+
+Holds the process-wide resources (model registry, online learner, shadow
+evaluator, drift monitor, admission controller, logos), the CSS and sidebar, and every page. Each
+entry point is a thin AppConfig passed to run_app(). All resources are built by
+one startup path, build_resources(), and cached once per process with
+st.cache_resource. Separate `streamlit run` processes share nothing; serve all
+three apps from one process, and one set of models, with
+`streamlit run onyx_apps.py`.
+
+Benchmark the cold startup path with:
+    python onyx_core.py --benchmark --repeat 5
+"""
+import argparse
+import base64
+import contextlib
+import hmac
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from onyx_admission import BATCH, INTERACTIVE, Rejected, client_address, create_admission_controller
+from onyx_contributions import (ContributionSummary, iter_contributions, multiple_contributions,
+                                 polynomial_contributions)
+from onyx_drift import MIN_OBSERVATIONS, DriftMonitor
+from onyx_encoding import load_indexed_multiple
+from onyx_evaluation import TARGET_COLUMN, evaluate, file_columns, input_columns, iter_chunks
+from onyx_goalseek import solve_multiple, solve_polynomial, solve_simple, targets_from_frame
+from onyx_history import HistoryStore
+from onyx_models import BASE_PATH
+from onyx_online import OnlineUpdater
+from onyx_optimizer import optimize_allocation, optimize_frame
+from onyx_profiler import MAX_PROFILES, SamplingProfiler, read_profile, recent_profiles, save_profile
+from onyx_registry import ModelRegistry
+from onyx_scenarios import ScenarioTable, default_scenarios
+from onyx_shadow import create_shadow_evaluator
+from onyx_simulation import DISTRIBUTIONS, simulate
+
+TOOL_PAGES = ["Budget Optimizer", "Drift Monitor", "Model Evaluation"]
+CONTRIBUTION_PREVIEW_ROWS = 1000
+SIMULATION_CHUNK = 250000
+
+
+@dataclass
+class AppConfig:
+    """What differs between the entry points; everything else lives in this module."""
+    page_title: str = "Regressify Pro Dashboard"
+    nav_separator: bool = False
+    notes: str = None
+    project_details: str = None
+    show_data_sources: bool = False
+
+
+class CoreResources:
+    """Process-wide state shared by every app built on the core."""
+
+    def __init__(self, registry, models, online, shadow, drift, admission, light_logo_b64, dark_logo_b64, timings):
+        self.registry = registry
+        self.models = models
+        self.online = online
+        self.shadow = shadow
+        self.drift = drift
+        self.admission = admission
+        self.light_logo_b64 = light_logo_b64
+        self.dark_logo_b64 = dark_logo_b64
+        self.timings = timings
+
+
+# Helper function to read image files and convert them to Base64
+def get_base64_image(image_path):
+    """Converts a local image file to a Base64 string for CSS embedding."""
+    try:
+        with open(image_path, "rb") as img_file:
+            # Return the Base64 string with the necessary data URI prefix
+            return base64.b64encode(img_file.read()).decode('utf-8')
+    except FileNotFoundError:
+        # Display an error in the app if a logo file is missing
+        st.error(f"Logo file not found: {image_path}")
+        return ""
+
+
+# ----- STARTUP PATH ------------------------------
+def build_resources():
+    """Builds every shared resource once, recording how long each stage took."""
+    timings = {}
+
+    start = time.perf_counter()
+    # Default manifest entries form the production `models` dict; variants load on first use
+    registry = ModelRegistry()
+    models = registry.production_models()
+    timings['models'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Online learner: publishes refreshed coefficients into `models` as feedback arrives
+    online = OnlineUpdater(models)
+    timings['online'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Candidate models (if any are staged in ./candidates) shadow every production prediction
+    shadow = create_shadow_evaluator()
+    timings['shadow'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Input drift sketches, fed by every successful prediction
+    drift = DriftMonitor()
+    timings['drift'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Admission control: bounded concurrency, per-client rate limits, load shedding
+    admission = create_admission_controller()
+    timings['admission'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Light logo (dark elements, for light background); dark logo (light/color elements, for dark background)
+    light_logo_b64 = get_base64_image(os.path.join(BASE_PATH, 'onyxcode_black.png'))
+    dark_logo_b64 = get_base64_image(os.path.join(BASE_PATH, 'onyxcode_color.png'))
+    timings['logos'] = time.perf_counter() - start
+
+    return CoreResources(registry, models, online, shadow, drift, admission, light_logo_b64, dark_logo_b64, timings)
+
+
+@st.cache_resource
+def load_resources():
+    return build_resources()
+
+
+# ----- RENDERING HELPERS ------------------------------
+def render_css(res):
+    """Injects the adaptive theme CSS, including the light/dark logo switch via Base64."""
+    light_logo_css = f'url("data:image/png;base64,{res.light_logo_b64}")'
+    dark_logo_css = f'url("data:image/png;base64,{res.dark_logo_b64}")'
+
+    st.markdown(f"""
+        <style>
+        /* ------------------- THEME STYLES ------------------- */
+        /* Default: dark mode colors */
+        .main-title {{
+            text-align: center;
+            color: #fff;
+            font-size: 2.5rem !important;
+            width: 100%;
+            font-weight: bold;
+            margin-bottom: 10px;
+        }}
+        .subtitle {{
+            text-align: center;
+            color: #ccc;
+            font-size: 1.1rem;
+            margin-bottom: 30px;
+        }}
+        .prediction-result {{
+            font-size: 1.5rem;
+            font-weight: bold;
+            text-align: center;
+            padding: 20px;
+            border-radius: 10px;
+            margin: 20px 0;
+        }}
+        .success-result {{
+            background-color: #d4edda;
+            color: #155724;
+        }}
+        .error-result {{
+            background-color: #f8d7da;
+            color: #721c24;
+        }}
+        .signature {{
+            text-align: center;
+            color: #999;
+            font-style: italic;
+            margin-top: 50px;
+            font-size: 0.9rem;
+        }}
+
+        /* Light mode overrides using browser media query */
+        @media (prefers-color-scheme: light) {{
+            .main-title {{
+                color: #222 !important;
+            }}
+            .subtitle {{
+                color: #666 !important;
+            }}
+            .prediction-result.success-result {{
+                background-color: #e8f5e9 !important;
+                color: #2e7d32 !important;
+            }}
+            .prediction-result.error-result {{
+                background-color: #ffebee !important;
+                color: #c62828 !important;
+            }}
+            .signature {{
+                color: #444 !important;
+            }}
+        }}
+    
+        /* ------------------- LOGO SWITCH FIX VIA BASE64 ------------------- */
+        .sidebar-logo-container {{
+            text-align: center;
+            margin-bottom: 20px;
+            padding: 10px;
+            /* Default: Dark mode logo (light/color) */
+            background-image: {dark_logo_css}; 
+            background-size: contain;
+            background-repeat: no-repeat;
+            background-position: center;
+            height: 100px; /* Adjust height as needed for your logo */
+            margin-top: 10px;
+        }}
+
+        /* Light Mode Logo Override (dark colors logo on light background) */
+        @media (prefers-color-scheme: light) {{
+            .sidebar-logo-container {{
+                background-image: {light_logo_css};
+            }}
+        }}
+        </style>
+    """, unsafe_allow_html=True)
+
+
+def client_id():
+    """Identifies the caller for rate limiting (see onyx_admission.client_address)."""
+    return client_address(st.context.ip_address, st.context.headers.get('X-Forwarded-For', ''))
+
+
+def admin_session():
+    """Operator sessions open the app with ?admin=<ONYX_ADMIN_TOKEN>; without the env var there are none."""
+    token = os.environ.get('ONYX_ADMIN_TOKEN', '')
+    return bool(token) and hmac.compare_digest(st.query_params.get('admin', ''), token)
+
+
+def admit(res, priority):
+    """Takes a prediction slot for this client; raises Rejected when the request is shed."""
+    return res.admission.acquire(client_id(), priority)
+
+
+def render_shed(error):
+    st.markdown(
+        f'<div class="prediction-result error-result">⏳ {error} Please try again in {error.retry_after:.0f}s.</div>',
+        unsafe_allow_html=True
+    )
+
+
+# Goal-seek helper: solves an uploaded column of targets in one vectorized call
+def render_goal_seek_batch(res, solve, input_name, key):
+    uploaded = st.file_uploader(
+        "Solve a batch of targets (CSV with a 'target' column):",
+        type="csv",
+        key=key
+    )
+    if uploaded is not None:
+        try:
+            targets = targets_from_frame(pd.read_csv(uploaded))
+            with admit(res, BATCH):
+                solved = solve(targets)
+            result = pd.DataFrame({'target': targets, input_name: solved})
+            st.dataframe(result, use_container_width=True, hide_index=True)
+            st.download_button(
+                "⬇️ Download results",
+                result.to_csv(index=False),
+                file_name=f"{key}.csv",
+                mime="text/csv"
+            )
+        except Rejected as e:
+            render_shed(e)
+        except Exception as e:
+            st.error(f"❌ Could not solve targets: {e}")
+
+
+# History helpers: each session keeps a bounded ring buffer of recent predictions per page
+def page_history(entry, columns):
+    if 'prediction_history' not in st.session_state:
+        st.session_state['prediction_history'] = HistoryStore()
+    return st.session_state['prediction_history'].get(entry['name'], columns)
+
+
+def render_history(history, entry, label, categories=None):
+    if not len(history):
+        return
+    with st.expander(f"🕘 Recent predictions ({len(history)} of the last {history.capacity})"):
+        frame = history.to_frame()
+        for column, labels in (categories or {}).items():
+            frame[column] = np.asarray(labels, dtype=object)[frame[column].astype(int)]
+        frame = frame.rename(columns={'prediction': label})
+        st.line_chart(frame[label].reset_index(drop=True))
+        st.dataframe(frame.iloc[::-1], use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Download history",
+            frame.to_csv(index=False),
+            file_name=f"{entry['name']}_history.csv",
+            mime="text/csv",
+            key=f"history_{entry['name']}"
+        )
+
+
+# Contribution helper: one prediction split into its parts, plus aggregates for an uploaded batch
+def render_contributions(res, entry, models, labels, contributions, input_columns):
+    with st.expander("🧮 Contribution breakdown"):
+        st.caption("Each prediction is the intercept plus coefficient × value for every term.")
+        breakdown = pd.DataFrame({'Contribution': contributions}, index=pd.Index(labels, name='Term'))
+        st.bar_chart(breakdown, horizontal=True)
+        st.dataframe(breakdown.style.format("{:,.2f}"), use_container_width=True)
+        st.caption(f"Sum of contributions (the prediction): {contributions.sum():,.2f}")
+
+        uploaded = st.file_uploader(
+            f"Break down a batch (CSV with columns: {', '.join(input_columns)}):",
+            type="csv",
+            key=f"contributions_{entry['name']}"
+        )
+        if uploaded is not None:
+            try:
+                frame = pd.read_csv(uploaded)
+                summary, preview = None, None
+                with admit(res, BATCH):
+                    for columns, matrix in iter_contributions(entry['kind'], models, frame, entry['features']):
+                        if summary is None:
+                            summary = ContributionSummary(columns)
+                            preview = pd.DataFrame(matrix[:CONTRIBUTION_PREVIEW_ROWS], columns=columns)
+                        summary.update(matrix)
+                if summary is None:
+                    raise ValueError("The file has no rows")
+                st.dataframe(summary.to_frame(), use_container_width=True)
+                st.caption(f"{summary.count:,} rows summarized, {summary.invalid:,} skipped as invalid")
+                preview['prediction'] = preview.sum(axis=1)
+                st.dataframe(preview, use_container_width=True, hide_index=True)
+                st.caption(f"First {len(preview):,} rows. Use onyx_contributions.py for per-row output of large files.")
+                st.download_button(
+                    "⬇️ Download summary",
+                    summary.to_frame().to_csv(),
+                    file_name=f"{entry['name']}_contributions.csv",
+                    mime="text/csv"
+                )
+            except Rejected as e:
+                render_shed(e)
+            except Exception as e:
+                st.error(f"❌ Could not break down the batch: {e}")
+
+
+# Simulation helper: a spend as a fixed value or a distribution around the current input
+def render_spend_distribution(key, label, value):
+    kind = st.selectbox(f"{label}:", DISTRIBUTIONS, format_func=str.capitalize, key=f"{key}_kind")
+    if kind == 'fixed':
+        return ('fixed', float(value))
+    names = {'normal': ["Mean", "Std Dev"], 'uniform': ["Low", "High"], 'triangular': ["Low", "Most Likely", "High"]}[kind]
+    defaults = {'normal': [value, 0.1 * value], 'uniform': [0.8 * value, 1.2 * value],
+                'triangular': [0.8 * value, value, 1.2 * value]}[kind]
+    params = []
+    for col, name, default in zip(st.columns(len(names)), names, defaults):
+        with col:
+            params.append(st.number_input(f"{name} ($):", min_value=0.0, value=float(default),
+                                          step=1000.0, key=f"{key}_{kind}_{name}"))
+    return (kind, *params)
+
+
+# Feedback helper: labeled outcomes update the production model online (recursive least squares).
+# Feedback retrains the model every session shares, so only operator sessions get the form.
+def render_feedback(res, entry, name, features, label):
+    if not entry.get('default', False) or name not in res.online.names or not admin_session():
+        return
+    with st.expander("📝 Report actual outcome"):
+        st.caption("Known the real result for these inputs? The production model learns from it immediately.")
+        actual = st.number_input(f"Actual {label}:", value=None, step=1.0, key=f"actual_{name}")
+        if st.button("Submit outcome", key=f"feedback_{name}", disabled=actual is None):
+            try:
+                error = res.online.learn(name, features, actual)
+                st.success(f"✅ Thanks! The previous prediction was off by {error:,.2f}; the model has been updated.")
+            except ValueError as e:
+                st.error(f"❌ Feedback rejected: {e}")
+
+
+def render_sidebar(config, res):
+    """Draws the sidebar and returns the selected page title."""
+    # Logo Placement in the sidebar
+    st.sidebar.markdown('<div class="sidebar-logo-container"></div>', unsafe_allow_html=True)
+
+    # Sidebar with Navigation (options come from the model manifest)
+    if config.nav_separator:
+        st.sidebar.markdown("---") # Creates a horizontal line separator
+    st.sidebar.title("Navigation")
+    page = st.sidebar.radio(
+        "Choose a regression type:",
+        ["Home"] + res.registry.page_titles() + TOOL_PAGES
+    )
+
+    # --- NOTES SECTION ---
+    if config.notes:
+        st.sidebar.markdown("---") # Creates a horizontal line separator
+        st.sidebar.markdown("### 💡 Notes") # A small heading for the section
+        st.sidebar.info(config.notes)
+
+    # --- PROJECT INFO SECTION ---
+    if config.project_details:
+        st.sidebar.markdown("---") # Separator before the Project Info
+        st.sidebar.markdown("### 📚 Project Details")
+        st.sidebar.markdown(config.project_details)
+
+    # --- PROFILES SECTION (debug sessions only) ---
+    if profiling_requested():
+        st.sidebar.markdown("---")
+        with st.sidebar.expander("🔬 Profiles"):
+            st.toggle("Profile every rerun", key="profile_enabled")
+            st.caption("Collapsed-stack profiles: open them in speedscope.app or flamegraph.pl.")
+            for profile in recent_profiles(st.session_state.get('profile_names', [])):
+                collapsed = read_profile(profile)
+                if collapsed is None:
+                    continue
+                st.markdown(
+                    f"**{profile['page']}** · {profile['duration_ms']:.0f} ms · {profile['samples']} samples"
+                )
+                st.download_button(
+                    "⬇️ Download",
+                    collapsed,
+                    file_name=os.path.basename(profile['path']),
+                    key=f"download_{profile['name']}"
+                )
+
+    # --- LOAD SECTION (once anything has been shed, or in debug sessions) ---
+    load = res.admission.stats()
+    if load['shed_total'] or profiling_requested():
+        st.sidebar.markdown("---")
+        with st.sidebar.expander("🚦 Load"):
+            st.caption("Predictions admitted and shed by this server process.")
+            st.dataframe(pd.Series(load, name="value"), use_container_width=True)
+
+    # --- SHADOW EVALUATION SECTION ---
+    if res.shadow is not None:
+        st.sidebar.markdown("---")
+        with st.sidebar.expander("🕶️ Shadow Evaluation"):
+            st.caption("Candidate vs production, compared off the request path.")
+            st.dataframe(pd.DataFrame(res.shadow.summary()).T, use_container_width=True)
+
+    return page
+
+
+# ----- HOME PAGE -----------------------------------
+def render_home(res):
+    st.markdown("---")
+    defaults = res.registry.defaults()
+
+    for col, default_entry in zip(st.columns(len(defaults)), defaults):
+        with col:
+            st.markdown(f"### {default_entry['page']['icon']} {default_entry['page']['short']}")
+            st.write(default_entry['page']['summary'])
+            st.info(default_entry['page']['info'])
+
+    st.markdown("---")
+    st.info("👈 Use the sidebar to select a regression type")
+
+
+
+# ----- SIMPLE LINEAR REGRESSION --------------------
+def render_simple(config, res, entry, models):
+    meta = entry['page']
+    missing_files = ' or '.join(entry['artifacts'].values())
+    is_default = entry.get('default', False)
+    shadow, drift = res.shadow, res.drift
+
+    st.markdown("---")
+    st.markdown(f"### {meta['icon']} {meta['heading']}")
+
+    if models['simple'] is None:
+        st.error(f"❌ Error: {missing_files} model file not found!")
+    else:
+        st.write("Enter the number of hours studied to predict exam marks.")
+        hours = st.number_input(
+            "Study Hours (1-10):",
+            key="hours",
+            min_value=1.0,
+            max_value=10.0,
+            value=5.0,
+            step=0.5,
+            help="Enter a value between 1 and 10"
+        )
+
+        # --- DATASET SOURCE ---
+        if config.show_data_sources:
+            st.caption(f"Data Source: {meta['source']}")
+        # ----------------------------
+
+        history = page_history(entry, ['hours'])
+        if st.button("🎯 Predict Marks", type="primary", use_container_width=True):
+            try:
+                with admit(res, INTERACTIVE):
+                    marks = models['simple'].predict([[hours]])
+                if shadow is not None and is_default:
+                    shadow.submit('simple', hours, marks[0])
+                drift.observe(hours=hours)
+                history.append([hours], marks[0])
+                st.markdown(
+                    f'<div class="prediction-result success-result">Predicted Marks: {int(marks[0])}</div>',
+                    unsafe_allow_html=True
+                )
+                st.balloons()
+            except Rejected as e:
+                render_shed(e)
+            except Exception as e:
+                st.markdown(
+                    f'<div class="prediction-result error-result">Error: {str(e)}</div>',
+                    unsafe_allow_html=True
+                )        
+
+        render_history(history, entry, "Marks")
+        render_feedback(res, entry, 'simple', hours, "Marks")
+
+        # --- GOAL SEEK ---
+        with st.expander("🎯 Goal Seek: study hours needed for a target mark"):
+            target = st.number_input("Target Marks:", value=80.0, step=1.0, key="goal_simple")
+            needed = solve_simple(models['simple'], [target])[0]
+            if np.isnan(needed):
+                st.error("❌ This model cannot reach the target.")
+            else:
+                st.write(f"Study **{needed:.2f} hours** to score {target:g} marks.")
+                if not 1 <= needed <= 10:
+                    st.warning("⚠️ This is outside the 1-10 hour range the model was trained on.")
+            render_goal_seek_batch(res, lambda t: solve_simple(models['simple'], t), 'hours', 'goal_seek_simple')
+
+
+
+# ----- POLYNOMIAL REGRESSION -----------------------
+def render_polynomial(config, res, entry, models):
+    meta = entry['page']
+    missing_files = ' or '.join(entry['artifacts'].values())
+    is_default = entry.get('default', False)
+    shadow, drift = res.shadow, res.drift
+
+    st.markdown("---")
+    st.markdown(f"### {meta['icon']} {meta['heading']}")
+
+    if models['poly_transformer'] is None or models['poly_lin_reg'] is None:
+        st.error(f"❌ Error: {missing_files} file not found!")
+    else:
+        st.write("Enter the position level to predict the salary.")
+        level = st.number_input(
+            "Position Level:",
+            key="level",
+            min_value=1,
+            max_value=10,
+            value=5,
+            step=1,
+            help="Enter the position level (typically 1-10)"
+        )
+
+        # --- DATASET SOURCE ---
+        if config.show_data_sources:
+            st.caption(f"Data Source: {meta['source']}")
+        # ----------------------------
+
+        history = page_history(entry, ['level'])
+        if st.button("🎯 Predict Salary", type="primary", use_container_width=True):
+            try:
+                with admit(res, INTERACTIVE):
+                    level_poly = models['poly_transformer'].transform([[level]])
+                    predict_sal = models['poly_lin_reg'].predict(level_poly)
+                if shadow is not None and is_default:
+                    shadow.submit('polynomial', level, predict_sal[0])
+                drift.observe(level=level)
+                history.append([level], predict_sal[0])
+                st.markdown(
+                    f'<div class="prediction-result success-result">Predicted Salary: ${int(predict_sal[0]):,}</div>',
+                    unsafe_allow_html=True
+                )
+                st.balloons()
+            except Rejected as e:
+                render_shed(e)
+            except Exception as e:
+                st.markdown(
+                    f'<div class="prediction-result error-result">Error: {str(e)}</div>',
+                    unsafe_allow_html=True
+                )
+
+        render_history(history, entry, "Salary ($)")
+
+        terms, contributions = polynomial_contributions(models['poly_transformer'], models['poly_lin_reg'], [level])
+        render_contributions(res, entry, models, ["Intercept"] + terms[1:], contributions[0], ['level'])
+        render_feedback(res, entry, 'polynomial', level, "Salary ($)")
+
+        # --- GOAL SEEK ---
+        with st.expander("🎯 Goal Seek: position level needed for a target salary"):
+            target = st.number_input("Target Salary ($):", value=300000, step=10000, key="goal_polynomial")
+
+            def solve_level(targets):
+                return solve_polynomial(models['poly_transformer'], models['poly_lin_reg'], targets, 1, 10)
+
+            needed = solve_level([target])[0]
+            if np.isnan(needed):
+                st.error("❌ No position level between 1 and 10 reaches this salary.")
+            else:
+                st.write(f"A position level of **{needed:.2f}** pays ${target:,}.")
+            render_goal_seek_batch(res, solve_level, 'level', 'goal_seek_polynomial')
+
+
+
+# ----- MULTIPLE LINEAR REGRESSION ------------------
+def render_multiple(config, res, entry, models):
+    meta = entry['page']
+    missing_files = ' or '.join(entry['artifacts'].values())
+    is_default = entry.get('default', False)
+    shadow, drift = res.shadow, res.drift
+
+    st.markdown("---")
+    st.markdown(f"### {meta['icon']} {meta['heading']}")
+
+    # Read before building the indexed view, so the view is never older than the version it is tagged with
+    model_version = res.online.version('multiple') if is_default else 0
+    # Indexed view: the location coefficient is gathered by index, no one-hot vector
+    profit_model = load_indexed_multiple(models, entry['features'])
+    if profit_model is None:
+        st.error(f"❌ Error: {missing_files} model file not found!")
+    else:
+        st.write("Enter startup financial details to predict profit.")
+
+        st.markdown("#### Location")
+        location_idx = st.selectbox(
+            "Location:",
+            range(len(profit_model.categories)),
+            key="location",
+            format_func=lambda i: profit_model.labels[i],
+            help="Region the startup operates in"
+        )
+
+        st.markdown("#### Financial Data")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            rd = st.number_input(
+                "R&D Spend ($):",
+                key="rd",
+                min_value=0,
+                value=100000,
+                step=1000,
+                help="Research and Development spending"
+            )
+
+            admin = st.number_input(
+                "Administration Spend ($):",
+                key="admin",
+                min_value=0,
+                value=100000,
+                step=1000,
+                help="Administrative costs"
+            )
+
+        with col2:
+            marketing = st.number_input(
+                "Marketing Spend ($):",
+                key="marketing",
+                min_value=0,
+                value=100000,
+                step=1000,
+                help="Marketing budget"
+            )
+
+        st.markdown("---")
+
+        # --- DATASET SOURCE ---
+        if config.show_data_sources:
+            st.caption(f"Data Source: {meta['source']}")
+        # ----------------------------
+
+        history = page_history(entry, [profit_model.schema['categorical']] + profit_model.numeric)
+        if st.button("🎯 Predict Profit", type="primary", use_container_width=True):
+            spend = [rd, admin, marketing]
+            error = profit_model.validate([location_idx], [spend])[0]
+            if error:
+                st.markdown(
+                    f'<div class="prediction-result error-result">{error}</div>',
+                    unsafe_allow_html=True
+                )
+            else:
+                try:
+                    with admit(res, INTERACTIVE):
+                        prediction = profit_model.predict_one(location_idx, spend)
+                    if shadow is not None and is_default:
+                        one_hot = [1 if i == location_idx else 0 for i in range(len(profit_model.categories))]
+                        shadow.submit('multiple', one_hot + spend, prediction)
+                    drift.observe(location=profit_model.categories[location_idx], rd=rd, admin=admin, marketing=marketing)
+                    history.append([location_idx] + spend, prediction)
+
+                    st.markdown(
+                        f'<div class="prediction-result success-result">Predicted Profit: ${int(prediction):,}</div>',
+                        unsafe_allow_html=True
+                    )
+                    st.balloons()
+                except Rejected as e:
+                    render_shed(e)
+                except Exception as e:
+                    st.markdown(
+                        f'<div class="prediction-result error-result">Error: {str(e)}</div>',
+                        unsafe_allow_html=True
+                    )
+
+        render_history(history, entry, "Profit ($)", {profit_model.schema['categorical']: profit_model.labels})
+
+        _, contributions = multiple_contributions(profit_model, [location_idx], [[rd, admin, marketing]])
+        render_contributions(
+            res, entry, models,
+            ["Intercept", f"Location ({profit_model.labels[location_idx]})"] + profit_model.numeric_labels,
+            contributions[0],
+            [profit_model.schema['categorical']] + profit_model.numeric
+        )
+
+        # --- MONTE CARLO SIMULATION ---
+        with st.expander("🎲 Monte Carlo: profit distribution under uncertain spend"):
+            st.caption("Location is taken from the inputs above. Each spend is fixed or drawn from a distribution.")
+            specs = [
+                render_spend_distribution(f"simulation_{entry['name']}_{name}", label, value)
+                for name, label, value in zip(profit_model.numeric, profit_model.numeric_labels, [rd, admin, marketing])
+            ]
+            samples = st.select_slider(
+                "Samples:",
+                [100_000, 1_000_000, 5_000_000, 10_000_000],
+                value=1_000_000,
+                format_func=lambda n: f"{n:,}"
+            )
+            workers = st.number_input("Worker processes:", min_value=1, max_value=res.admission.batch_slots, value=1)
+            if st.button("🎲 Run Simulation", use_container_width=True):
+                progress = st.progress(0.0)
+                stats_slot, chart_slot = st.empty(), st.empty()
+                chunks = -(-samples // SIMULATION_CHUNK)
+                try:
+                    with admit(res, BATCH), contextlib.ExitStack() as stack:
+                        # Every worker process beyond the first holds a batch slot of its own
+                        extra = res.admission.reserve(BATCH, workers - 1)
+                        for slot in extra:
+                            stack.enter_context(slot)
+                        granted = 1 + len(extra)
+                        if granted < workers:
+                            st.caption(f"The server is busy: running on {granted} of {workers} worker processes.")
+                        runs = stack.enter_context(contextlib.closing(
+                            simulate(profit_model, specs, location_idx, samples, SIMULATION_CHUNK, granted)
+                        ))
+                        for done, distribution in enumerate(runs, 1):
+                            progress.progress(done / chunks, text=f"{distribution.count:,} of {samples:,} samples")
+                            summary = distribution.summary()
+                            with stats_slot.container():
+                                for col, key in zip(st.columns(4), ['p5', 'p50', 'p95', 'mean']):
+                                    col.metric(key.upper() if key != 'mean' else "Mean", f"${summary[key]:,.0f}")
+                                st.caption(f"Std dev ${summary['std']:,.0f} · range ${summary['min']:,.0f} to "
+                                           f"${summary['max']:,.0f} · P(loss) {summary['prob_loss']:.2%}")
+                            centers, counts = distribution.histogram()
+                            chart_slot.bar_chart(pd.DataFrame(
+                                {'Samples': counts},
+                                index=pd.Index(centers.round(-2), name="Profit ($)")
+                            ))
+                except Rejected as e:
+                    render_shed(e)
+                except ValueError as e:
+                    st.error(f"❌ Could not run the simulation: {e}")
+
+        one_hot = [1 if i == location_idx else 0 for i in range(len(profit_model.categories))]
+        render_feedback(res, entry, 'multiple', one_hot + [rd, admin, marketing], "Profit ($)")
+
+        # --- GOAL SEEK ---
+        with st.expander("🎯 Goal Seek: spend needed for a target profit"):
+            st.caption("Location and the other spends are taken from the inputs above.")
+            solve_for = st.selectbox(
+                "Solve for:",
+                profit_model.numeric,
+                format_func=lambda name: profit_model.numeric_labels[profit_model.numeric.index(name)]
+            )
+            target = st.number_input("Target Profit ($):", value=200000, step=10000, key="goal_multiple")
+
+            def solve_spend(targets):
+                return solve_multiple(profit_model, targets, solve_for, location_idx, [rd, admin, marketing])
+
+            needed = solve_spend([target])[0]
+            if np.isnan(needed):
+                st.error("❌ This spend has no effect on predicted profit.")
+            else:
+                st.write(f"A spend of **${needed:,.0f}** reaches ${target:,} profit.")
+                if needed < 0:
+                    st.warning("⚠️ The target is only reachable with a negative spend.")
+            render_goal_seek_batch(res, solve_spend, solve_for, 'goal_seek_multiple')
+
+        # --- SCENARIO COMPARISON ---
+        st.markdown("---")
+        st.markdown("#### 📋 Scenario Comparison")
+        st.write("Edit, add or delete rows to compare scenarios. Only the rows you change are re-scored.")
+
+        scenarios_key = f"scenarios_{entry['name']}"
+        if scenarios_key not in st.session_state:
+            st.session_state[scenarios_key] = default_scenarios(profit_model)
+
+        uploaded = st.file_uploader(
+            "Load scenarios from CSV (columns: location, rd, admin, marketing)",
+            type="csv",
+            key=f"{scenarios_key}_upload"
+        )
+        if uploaded is not None and st.session_state.get(f"{scenarios_key}_upload_id") != uploaded.file_id:
+            try:
+                table = ScenarioTable.from_frame(pd.read_csv(uploaded), profit_model)
+                with admit(res, BATCH):
+                    table.rescore(profit_model)
+                st.session_state[scenarios_key] = table
+                st.session_state[f"{scenarios_key}_upload_id"] = uploaded.file_id
+            except Rejected as e:
+                render_shed(e)
+            except Exception as e:
+                st.error(f"❌ Could not load scenarios: {e}")
+
+        scenarios = st.session_state[scenarios_key]
+        # Feedback may have published new coefficients since these rows were scored
+        scenarios.sync(profit_model, model_version)
+        editor_key = f"{scenarios_key}_editor_{scenarios.version}"
+
+        def apply_scenario_edits():
+            scenarios.apply_edits(profit_model, st.session_state[editor_key])
+
+        st.data_editor(
+            scenarios.to_frame(profit_model),
+            key=editor_key,
+            on_change=apply_scenario_edits,
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            disabled=["prediction"],
+            column_config={
+                "location": st.column_config.SelectboxColumn("Location", options=profit_model.labels, required=True),
+                "rd": st.column_config.NumberColumn("R&D Spend ($)", min_value=0, step=1000, format="%d"),
+                "admin": st.column_config.NumberColumn("Administration Spend ($)", min_value=0, step=1000, format="%d"),
+                "marketing": st.column_config.NumberColumn("Marketing Spend ($)", min_value=0, step=1000, format="%d"),
+                "prediction": st.column_config.NumberColumn("Predicted Profit ($)", format="$%d"),
+            }
+        )
+        st.caption(f"{len(scenarios):,} scenarios · {scenarios.last_rescored:,} row(s) re-scored on the last edit")
+
+
+
+# ----- BUDGET OPTIMIZER ----------------------------
+def render_budget_optimizer(res):
+    st.markdown("---")
+    st.markdown("### 💰 Startup Budget Optimizer")
+
+    profit_entry = res.registry.entry(st.selectbox(
+        "Profit model:",
+        res.registry.names('multiple'),
+        format_func=lambda name: res.registry.entry(name)['page']['title']
+    ))
+    profit_model = load_indexed_multiple(res.registry.get(profit_entry['name']), profit_entry['features'])
+    if profit_model is None:
+        st.error(f"❌ Error: {' or '.join(profit_entry['artifacts'].values())} model file not found!")
+    else:
+        st.write("Split a total budget across R&D, administration and marketing to maximize predicted profit.")
+
+        location_choice = st.selectbox(
+            "Location:",
+            [None] + list(range(len(profit_model.categories))),
+            format_func=lambda i: "Best location" if i is None else profit_model.labels[i]
+        )
+        budget = st.number_input("Total Budget ($):", min_value=0, value=300000, step=10000)
+        spend_all = st.checkbox(
+            "Spend the whole budget",
+            value=True,
+            help="When unchecked, spends that lower predicted profit stay at their minimum"
+        )
+
+        st.markdown("#### Spend Bounds")
+        lower, upper = [], []
+        for name, label in zip(profit_model.numeric, profit_model.numeric_labels):
+            col1, col2 = st.columns(2)
+            with col1:
+                lower.append(st.number_input(f"{label} min ($):", min_value=0, value=0, step=10000, key=f"{name}_min"))
+            with col2:
+                upper.append(st.number_input(f"{label} max ($):", min_value=0, value=200000, step=10000, key=f"{name}_max"))
+
+        allocation, best_location, profit, feasible = optimize_allocation(
+            profit_model, [budget], lower, upper, location_choice, spend_all
+        )
+        if not feasible[0]:
+            st.markdown(
+                '<div class="prediction-result error-result">No allocation fits this budget within the bounds</div>',
+                unsafe_allow_html=True
+            )
+        else:
+            st.markdown(
+                f'<div class="prediction-result success-result">Predicted Profit: ${int(profit[0]):,}</div>',
+                unsafe_allow_html=True
+            )
+            st.dataframe(
+                pd.DataFrame({
+                    'Category': profit_model.numeric_labels,
+                    'Spend ($)': allocation[0].round(0),
+                    'Profit per $': profit_model.numeric_coef.round(4)
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(f"Location: {profit_model.labels[best_location[0]]}")
+
+        # --- BATCH SCENARIOS ---
+        st.markdown("---")
+        st.markdown("#### 📦 Batch Scenarios")
+        uploaded = st.file_uploader(
+            "Optimize many budgets at once (CSV with a 'budget' column; optional location, rd_min, rd_max, ...):",
+            type="csv",
+            key="optimizer_upload"
+        )
+        if uploaded is not None:
+            try:
+                frame = pd.read_csv(uploaded)
+                with admit(res, BATCH):
+                    result = optimize_frame(profit_model, frame, lower, upper, spend_all)
+                st.dataframe(result, use_container_width=True, hide_index=True)
+                st.download_button(
+                    "⬇️ Download allocations",
+                    result.to_csv(index=False),
+                    file_name="budget_allocations.csv",
+                    mime="text/csv"
+                )
+            except Rejected as e:
+                render_shed(e)
+            except Exception as e:
+                st.error(f"❌ Could not optimize scenarios: {e}")
+
+
+
+# ----- DRIFT MONITOR ------------------------------
+def render_drift_monitor(res):
+    drift = res.drift
+    st.markdown("---")
+    st.markdown("### 📈 Input Drift Monitor")
+    st.write("Live prediction inputs compared with the reference profile of the models' training data.")
+
+    report = pd.DataFrame(drift.report()).set_index('feature')
+    st.dataframe(
+        report.style.format(precision=3, na_rep="–"),
+        use_container_width=True
+    )
+    st.caption(
+        "PSI below 0.1 is stable, 0.1–0.25 a moderate shift, above 0.25 a significant shift. "
+        f"A feature gets a status once it has {MIN_OBSERVATIONS} observations."
+    )
+    assumed = report.index[report['reference'] == 'assumed'].tolist()
+    if assumed:
+        st.info(
+            f"The reference for {', '.join(assumed)} assumes a uniform spread over the training ranges. "
+            "Build it from real data with `python onyx_drift.py --write-reference --data training.csv`."
+        )
+
+    feature = st.selectbox("Feature histogram:", drift.features)
+    labels, live, reference = drift.histogram(feature)
+    st.bar_chart(
+        pd.DataFrame({'Live': live, 'Reference': reference}, index=labels),
+        stack=False
+    )
+
+
+
+# ----- MODEL EVALUATION ------------------------------
+def render_model_evaluation(res):
+    st.markdown("---")
+    st.markdown("### 🧪 Model Evaluation")
+    st.write("Measure a model's accuracy on labeled holdout data. The file is scored in chunks as it streams.")
+
+    entry = res.registry.entry(st.selectbox(
+        "Model:",
+        res.registry.names(),
+        format_func=lambda name: res.registry.entry(name)['page']['title']
+    ))
+    columns = input_columns(entry['kind'], entry['features'])
+    uploaded = st.file_uploader(
+        f"Holdout data (CSV or Parquet with columns: {', '.join(columns)} and a label column):",
+        type=["csv", "parquet"],
+        key="evaluation_upload"
+    )
+    if uploaded is None:
+        return
+
+    try:
+        available = file_columns(uploaded)
+    except Exception as e:
+        st.error(f"❌ Could not read the file: {e}")
+        return
+    target = st.selectbox(
+        "Label column:",
+        available,
+        index=available.index(TARGET_COLUMN) if TARGET_COLUMN in available else len(available) - 1
+    )
+    if not st.button("🧪 Evaluate", type="primary", use_container_width=True):
+        return
+
+    progress = st.empty()
+    metrics_slot, slices_slot, histogram_slot = st.empty(), st.empty(), st.empty()
+    try:
+        uploaded.seek(0)
+        with admit(res, BATCH):
+            chunks = iter_chunks(uploaded, columns=columns + [target])
+            for evaluation in evaluate(entry['kind'], res.registry.get(entry['name']), chunks, target, entry['features']):
+                summary = evaluation.overall.summary()
+                progress.caption(f"{summary['rows']:,} rows scored, {evaluation.skipped:,} skipped as invalid")
+                with metrics_slot.container():
+                    for col, key, label in zip(st.columns(4), ['r2', 'rmse', 'mae', 'bias'], ["R²", "RMSE", "MAE", "Bias"]):
+                        col.metric(label, f"{summary[key]:.4f}" if key == 'r2' else f"{summary[key]:,.2f}")
+                if evaluation.slices:
+                    with slices_slot.container():
+                        st.markdown("#### By Location")
+                        st.dataframe(evaluation.slices_frame(), use_container_width=True)
+                with histogram_slot.container():
+                    st.markdown("#### Residuals (actual − predicted)")
+                    st.bar_chart(evaluation.residuals.to_frame())
+    except Rejected as e:
+        render_shed(e)
+    except Exception as e:
+        st.error(f"❌ Could not evaluate the model: {e}")
+
+
+
+MODEL_PAGES = {
+    'simple': render_simple,
+    'polynomial': render_polynomial,
+    'multiple': render_multiple,
+}
+
+
+# ----- PROFILING ------------------------------
+def profiling_requested():
+    """Debug sessions are operator sessions opened with ?profile=1 in the URL."""
+    return st.query_params.get('profile') == '1' and admin_session()
+
+
+def profiling_enabled():
+    """Profiles every rerun of a debug session until the sidebar toggle is switched off."""
+    if not profiling_requested():
+        return False
+    return st.session_state.setdefault('profile_enabled', True)
+
+
+def profile_inputs():
+    """Keyed widget values of the session, used to tag a saved profile."""
+    return {
+        key: value for key, value in sorted(st.session_state.items())
+        if isinstance(value, (bool, int, float, str)) and not key.startswith('download_')
+    }
+
+
+def run_app(config):
+    """Renders one full rerun of an app described by config, profiling it when enabled."""
+    # ----- PAGE CONFIGURATION -------------------------
+    st.set_page_config(
+        page_title=config.page_title,
+        page_icon="📊",
+        layout="centered"
+    )
+
+    if not profiling_enabled():
+        render_app(config)
+        return
+
+    profiler = SamplingProfiler().start()
+    page = "unknown"
+    try:
+        page = render_app(config)
+    finally:
+        profiler.stop()
+        metadata = save_profile(profiler, page, profile_inputs())
+        # Each session lists only its own profiles
+        names = st.session_state.get('profile_names', []) + [metadata['name']]
+        st.session_state['profile_names'] = names[-MAX_PROFILES:]
+
+
+def render_app(config):
+    """Renders the page content and returns the selected page title."""
+    res = load_resources()
+    for default_entry in res.registry.defaults():
+        for message in res.registry.errors.get(default_entry['name'], []):
+            st.warning(f"⚠️ {message}")
+
+    render_css(res)
+    page = render_sidebar(config, res)
+
+    # ----- TITLE & SUBTITLE ----------------------------
+    st.markdown(f'<p class="main-title">📊 {config.page_title}</p>', unsafe_allow_html=True)
+    st.markdown('<p class="subtitle">Select a regression type to make predictions</p>', unsafe_allow_html=True)
+
+    # Model pages come from the manifest; their kind picks the layout
+    entry = res.registry.entry_for_page(page)
+    if page == "Home":
+        render_home(res)
+    elif entry is not None:
+        MODEL_PAGES[entry['kind']](config, res, entry, res.registry.get(entry['name']))
+    elif page == "Budget Optimizer":
+        render_budget_optimizer(res)
+    elif page == "Drift Monitor":
+        render_drift_monitor(res)
+    elif page == "Model Evaluation":
+        render_model_evaluation(res)
+
+    # ----- SIGNATURE / FOOTER --------------------------
+    st.markdown(f'<p class="signature">Made with ❤️ by <b>ONYXCODE</b> using Streamlit | © 2025 {config.page_title}</p>', unsafe_allow_html=True)
+    return page
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the shared startup path.")
+    parser.add_argument('--benchmark', action='store_true', help="Time build_resources() stage by stage")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of cold builds to time")
+    args = parser.parse_args(argv)
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        res = build_resources()
+        runs.append(dict(res.timings, total=time.perf_counter() - start))
+    report = pd.DataFrame(runs, index=pd.RangeIndex(1, len(runs) + 1, name='run')) * 1000
+    print(report.round(3).to_string())
+    print("(milliseconds per build; run 1 also pays for importing and unpickling scikit-learn)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Cross-validated polynomial degree selection for the Level -> Salary model.
+
+The highest-degree power expansion is computed once. PolynomialFeatures orders
+its output columns by total degree, so every lower degree is just a leading
+column slice of that expansion. Degrees are cross-validated in parallel across
+a process pool. Each worker receives the expansion once, in its initializer,
+and then only the degree to evaluate.
+
+The winning PolynomialFeatures and LinearRegression are written next to a
+timing and score report. The default output directory is ./candidates, where
+shadow mode (onyx_shadow.py) picks them up for comparison against production.
+
+Usage:
+    python onyx_degree_selection.py Position_Salaries.csv --x-col Level --y-col Salary --max-degree 8
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import PolynomialFeatures
+
+from onyx_models import BASE_PATH, MODEL_FILES
+
+OUTPUT_DIR = os.path.join(BASE_PATH, 'candidates')
+
+_expanded = None
+_target = None
+_folds = None
+_n_features = None
+
+
+def n_columns(n_features, degree):
+    """Number of PolynomialFeatures output columns (with bias) up to the given degree."""
+    return comb(n_features + degree, degree)
+
+
+def _init_worker(expanded, target, folds, n_features):
+    global _expanded, _target, _folds, _n_features
+    _expanded, _target, _folds, _n_features = expanded, target, folds, n_features
+
+
+def evaluate_degree(degree):
+    """k-fold CV of one degree on a column slice of the shared expansion."""
+    start = time.perf_counter()
+    X = _expanded[:, :n_columns(_n_features, degree)]
+    r2, rmse = [], []
+    for train, test in _folds:
+        model = LinearRegression().fit(X[train], _target[train])
+        residual = _target[test] - model.predict(X[test])
+        rmse.append(float(np.sqrt(np.mean(residual ** 2))))
+        total = np.sum((_target[test] - _target[test].mean()) ** 2)
+        r2.append(float(1 - np.sum(residual ** 2) / total) if total > 0 else float('nan'))
+    return {
+        'degree': degree,
+        'cv_rmse_mean': float(np.mean(rmse)),
+        'cv_rmse_std': float(np.std(rmse)),
+        'cv_r2_mean': float(np.nanmean(r2)) if not np.all(np.isnan(r2)) else float('nan'),
+        'cv_r2_std': float(np.nanstd(r2)) if not np.all(np.isnan(r2)) else float('nan'),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def select_degree(X, y, degrees, folds=5, workers=None, seed=0):
+    """Cross-validates every degree in parallel and returns (results, best degree, timings)."""
+    timings = {}
+    start = time.perf_counter()
+    expanded = PolynomialFeatures(degree=max(degrees), include_bias=True).fit_transform(X)
+    timings['expansion_seconds'] = time.perf_counter() - start
+
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=seed).split(X))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(expanded, y, splits, X.shape[1])
+    ) as pool:
+        results = list(pool.map(evaluate_degree, degrees))
+    timings['cv_seconds'] = time.perf_counter() - start
+
+    best = min(results, key=lambda r: r['cv_rmse_mean'])['degree']
+    return results, best, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Choose the polynomial degree by parallel k-fold CV.")
+    parser.add_argument('data', help="CSV file with the training data")
+    parser.add_argument('--x-col', nargs='+', default=['Level'], help="Input column(s)")
+    parser.add_argument('--y-col', default='Salary', help="Target column")
+    parser.add_argument('--min-degree', type=int, default=1)
+    parser.add_argument('--max-degree', type=int, default=8)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0, help="Fold shuffling seed")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="Where to write the artifacts and report")
+    args = parser.parse_args(argv)
+    if not 1 <= args.min_degree <= args.max_degree:
+        parser.error("Degrees must satisfy 1 <= --min-degree <= --max-degree")
+
+    frame = pd.read_csv(args.data)
+    X = frame[args.x_col].to_numpy(dtype=float)
+    y = frame[args.y_col].to_numpy(dtype=float)
+    if args.folds < 2 or args.folds > len(y):
+        parser.error(f"--folds must be between 2 and the number of rows ({len(y)})")
+
+    started = time.perf_counter()
+    degrees = list(range(args.min_degree, args.max_degree + 1))
+    results, best, timings = select_degree(X, y, degrees, args.folds, args.workers, args.seed)
+
+    # Refit the winner on all rows and write it under the names the app loads
+    start = time.perf_counter()
+    transformer = PolynomialFeatures(degree=best, include_bias=True).fit(X)
+    model = LinearRegression().fit(transformer.transform(X), y)
+    timings['refit_seconds'] = time.perf_counter() - start
+    timings['total_seconds'] = time.perf_counter() - started
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, MODEL_FILES['poly_transformer']), 'wb') as f:
+        pickle.dump(transformer, f)
+    with open(os.path.join(args.output_dir, MODEL_FILES['poly_lin_reg']), 'wb') as f:
+        pickle.dump(model, f)
+
+    report = {
+        'data': os.path.abspath(args.data),
+        'rows': len(y),
+        'folds': args.folds,
+        'best_degree': best,
+        'timings': timings,
+        'results': results,
+    }
+    with open(os.path.join(args.output_dir, 'degree_selection_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(pd.DataFrame(results).set_index('degree').to_string(float_format=lambda v: f"{v:,.4g}"))
+    print(f"\nBest degree: {best} (total {timings['total_seconds']:.2f}s); artifacts written to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
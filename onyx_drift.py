@@ -0,0 +1,321 @@
+"""Constant-memory input drift monitoring against a stored reference profile.
+
+Every prediction folds its inputs into fixed-bin histograms and running
+mean/variance sketches, so memory does not grow with request count. Drift is
+scored per feature with the Population Stability Index (PSI) of the live
+histogram against the reference histogram, plus the shift of the live mean in
+reference standard deviations. Features with fewer than MIN_OBSERVATIONS live
+inputs get no status, since PSI over a handful of points is mostly noise.
+
+The reference profile should come from the data the models were trained or
+validated on. Build it from a CSV or Parquet file (onyx_stream.py field
+names); bins are then the data's deciles:
+    python onyx_drift.py --write-reference --data training.csv
+Without --data, or for features missing from the file, the profile falls back
+to an assumed uniform spread over TRAINING_RANGES.
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from onyx_models import BASE_PATH, LOCATIONS
+
+REFERENCE_PATH = os.path.join(BASE_PATH, 'drift_reference.json')
+
+# Input ranges the widgets and training data assume: feature -> (low, high)
+TRAINING_RANGES = {
+    'hours': (1.0, 10.0),
+    'level': (1.0, 10.0),
+    'rd': (0.0, 165349.2),
+    'admin': (51283.14, 182645.56),
+    'marketing': (0.0, 471784.1),
+}
+REFERENCE_BINS = 10
+
+# PSI thresholds commonly used for "stable" / "moderate shift" / "significant shift"
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Live observations a feature needs before its PSI is given a status
+MIN_OBSERVATIONS = int(os.environ.get('ONYX_DRIFT_MIN_OBSERVATIONS', 100))
+
+_EPSILON = 1e-4
+
+
+class NumericSketch:
+    """Fixed-bin histogram (with under/overflow bins) plus Welford mean and variance."""
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        # Bins are [lo, hi) except the last inner bin, which includes the top of the range
+        slot = bisect.bisect_right(self.edges, value)
+        if value == self.edges[-1]:
+            slot -= 1
+        self.counts[slot] += 1
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class CategorySketch:
+    """Counts per category, with one extra slot for unknown values."""
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self._index = {c: i for i, c in enumerate(self.categories)}
+        self.counts = [0] * (len(self.categories) + 1)
+        self.n = 0
+
+    def update(self, value):
+        self.counts[self._index.get(value, len(self.categories))] += 1
+        self.n += 1
+
+
+def psi(live_counts, reference_proportions):
+    """Population Stability Index between live counts and reference proportions."""
+    total = sum(live_counts)
+    if total == 0:
+        return float('nan')
+    score = 0.0
+    for count, expected in zip(live_counts, reference_proportions):
+        actual = max(count / total, _EPSILON)
+        expected = max(expected, _EPSILON)
+        score += (actual - expected) * math.log(actual / expected)
+    return score
+
+
+def drift_status(score, observations=None, min_observations=MIN_OBSERVATIONS):
+    if math.isnan(score) or observations == 0:
+        return "no data"
+    if observations is not None and observations < min_observations:
+        return f"collecting ({observations}/{min_observations})"
+    if score < PSI_MODERATE:
+        return "stable"
+    if score < PSI_SIGNIFICANT:
+        return "moderate"
+    return "significant"
+
+
+def build_reference(ranges=TRAINING_RANGES, bins=REFERENCE_BINS):
+    """Builds a reference profile assuming inputs are spread uniformly over the training ranges."""
+    numeric = {}
+    for feature, (low, high) in ranges.items():
+        width = (high - low) / bins
+        edges = [low + i * width for i in range(bins + 1)]
+        # Under/overflow bins are empty in the reference; inner bins share the mass equally
+        proportions = [0.0] + [1.0 / bins] * bins + [0.0]
+        numeric[feature] = {
+            'edges': edges,
+            'proportions': proportions,
+            'mean': (low + high) / 2,
+            'std': (high - low) / math.sqrt(12),
+            'source': 'assumed',
+        }
+    categorical = {
+        'location': {
+            'categories': list(LOCATIONS),
+            'proportions': [1.0 / len(LOCATIONS)] * len(LOCATIONS) + [0.0],
+            'source': 'assumed',
+        }
+    }
+    return {'numeric': numeric, 'categorical': categorical}
+
+
+def numeric_profile(values, bins=REFERENCE_BINS):
+    """Reference profile of observed values, binned at their quantiles; None if they are constant."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1))) if len(values) else []
+    if len(edges) < 2:
+        return None
+    # np.histogram closes the last bin like NumericSketch does
+    counts, _ = np.histogram(values, bins=edges)
+    return {
+        'edges': edges.tolist(),
+        'proportions': [0.0] + (counts / len(values)).tolist() + [0.0],
+        'mean': float(values.mean()),
+        'std': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+        'source': 'data',
+        'observations': len(values),
+    }
+
+
+def category_profile(values, categories=LOCATIONS):
+    """Reference proportions of observed category names, normalized like multiple_row does."""
+    names = [str(value).lower().replace(' ', '') for value in values]
+    if not names:
+        return None
+    counts = [names.count(c) for c in categories]
+    counts.append(len(names) - sum(counts))
+    return {
+        'categories': list(categories),
+        'proportions': [count / len(names) for count in counts],
+        'source': 'data',
+        'observations': len(names),
+    }
+
+
+def build_reference_from_data(source, ranges=TRAINING_RANGES, bins=REFERENCE_BINS):
+    """Builds a reference profile from a CSV or Parquet file of model inputs.
+
+    Features the file lacks (or holds only one distinct value of) keep the
+    assumed profile of build_reference.
+    """
+    from onyx_evaluation import file_columns, iter_chunks
+
+    reference = build_reference(ranges, bins)
+    wanted = [c for c in file_columns(source) if c in reference['numeric'] or c in reference['categorical']]
+    if not wanted:
+        raise ValueError(f"No monitored feature columns ({', '.join(list(ranges) + ['location'])}) in the data")
+    columns = {c: [] for c in wanted}
+    for frame in iter_chunks(source, columns=wanted):
+        for c in wanted:
+            columns[c].append(frame[c].dropna().to_numpy())
+
+    for feature, parts in columns.items():
+        values = np.concatenate(parts)
+        if feature in reference['numeric']:
+            profile = numeric_profile(values.astype(float), bins)
+            if profile is not None:
+                reference['numeric'][feature] = profile
+        else:
+            profile = category_profile(values, reference['categorical'][feature]['categories'])
+            if profile is not None:
+                reference['categorical'][feature] = profile
+    return reference
+
+
+def load_reference(path=REFERENCE_PATH):
+    """Loads the stored reference profile, falling back to the built-in training ranges."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return build_reference()
+
+
+class DriftMonitor:
+    """Process-wide drift sketches fed from the prediction path."""
+
+    def __init__(self, reference=None):
+        self.reference = reference or load_reference()
+        self._lock = threading.Lock()
+        self._numeric = {
+            feature: NumericSketch(profile['edges'])
+            for feature, profile in self.reference['numeric'].items()
+        }
+        self._categorical = {
+            feature: CategorySketch(profile['categories'])
+            for feature, profile in self.reference['categorical'].items()
+        }
+
+    def observe(self, **inputs):
+        """Folds one prediction's inputs into the sketches (unknown features are ignored)."""
+        with self._lock:
+            for feature, value in inputs.items():
+                if feature in self._numeric:
+                    self._numeric[feature].update(float(value))
+                elif feature in self._categorical:
+                    self._categorical[feature].update(value)
+
+    def report(self):
+        """Returns one row of drift statistics per monitored feature."""
+        rows = []
+        with self._lock:
+            for feature, sketch in self._numeric.items():
+                profile = self.reference['numeric'][feature]
+                score = psi(sketch.counts, profile['proportions'])
+                shift = (sketch.mean - profile['mean']) / profile['std'] if sketch.n and profile['std'] else float('nan')
+                rows.append({
+                    'feature': feature,
+                    'observations': sketch.n,
+                    'mean': sketch.mean if sketch.n else float('nan'),
+                    'std': sketch.std,
+                    'reference_mean': profile['mean'],
+                    'mean_shift_sd': shift,
+                    'out_of_range': sketch.counts[0] + sketch.counts[-1],
+                    'psi': score,
+                    'status': drift_status(score, sketch.n),
+                    'reference': profile.get('source', 'assumed'),
+                })
+            for feature, sketch in self._categorical.items():
+                profile = self.reference['categorical'][feature]
+                score = psi(sketch.counts, profile['proportions'])
+                rows.append({
+                    'feature': feature,
+                    'observations': sketch.n,
+                    'mean': float('nan'),
+                    'std': float('nan'),
+                    'reference_mean': float('nan'),
+                    'mean_shift_sd': float('nan'),
+                    'out_of_range': sketch.counts[-1],
+                    'psi': score,
+                    'status': drift_status(score, sketch.n),
+                    'reference': profile.get('source', 'assumed'),
+                })
+        return rows
+
+    def histogram(self, feature):
+        """Returns (bin labels, live proportions, reference proportions) for one feature."""
+        with self._lock:
+            if feature in self._numeric:
+                sketch = self._numeric[feature]
+                edges = sketch.edges
+                labels = [f"< {edges[0]:,.6g}"]
+                labels += [f"{lo:,.6g} – {hi:,.6g}" for lo, hi in zip(edges[:-1], edges[1:])]
+                labels += [f"> {edges[-1]:,.6g}"]
+                reference = self.reference['numeric'][feature]['proportions']
+            else:
+                sketch = self._categorical[feature]
+                labels = sketch.categories + ['(unknown)']
+                reference = self.reference['categorical'][feature]['proportions']
+            counts = list(sketch.counts)
+        total = sum(counts)
+        live = [c / total if total else 0.0 for c in counts]
+        return labels, live, reference
+
+    @property
+    def features(self):
+        return list(self._numeric) + list(self._categorical)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the drift monitor's reference profile.")
+    parser.add_argument('--write-reference', action='store_true', help="Write the reference profile")
+    parser.add_argument('--data', help="Training or holdout CSV/Parquet file to build the reference from "
+                                       "(default: assume a uniform spread over the training ranges)")
+    parser.add_argument('--path', default=REFERENCE_PATH, help="Reference profile location")
+    args = parser.parse_args(argv)
+    if not args.write_reference:
+        parser.print_help()
+        return
+    try:
+        reference = build_reference_from_data(args.data) if args.data else build_reference()
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.path, 'w') as f:
+        json.dump(reference, f, indent=2)
+    sources = {feature: profile['source'] for group in reference.values() for feature, profile in group.items()}
+    print(f"Wrote reference profile to {args.path}")
+    for feature, source in sources.items():
+        print(f"  {feature:<10} {source}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from onyx_models import MULTIPLE_SCHEMA
+
+# ----- INDEXED CATEGORICAL ENCODING -------------------------
+# A linear model with a one-hot categorical block never needs the dense one-hot
+# vector: the active category contributes exactly its own coefficient. Single
+# and batch predictions gather that coefficient by index; batch paths that need
+# a full design matrix get a sparse one, so dozens of regions cost one stored
+# entry per row instead of a dense one-hot block.
+
+
+class IndexedLinearModel:
+    """Linear model split into intercept, per-category coefficients and numeric coefficients."""
+
+    def __init__(self, intercept, category_coef, numeric_coef, schema):
+        self.intercept = float(intercept)
+        self.category_coef = np.asarray(category_coef, dtype=float)
+        self.numeric_coef = np.asarray(numeric_coef, dtype=float)
+        self.schema = schema
+        self.categories = list(schema['categories'])
+        self.labels = list(schema.get('category_labels', self.categories))
+        self.numeric = list(schema['numeric'])
+        self.numeric_labels = list(schema.get('numeric_labels', self.numeric))
+        self._coef = np.concatenate([self.category_coef, self.numeric_coef])
+        self._index = {name: i for i, name in enumerate(self.categories)}
+        self._index.update({normalize_category(label): i for i, label in enumerate(self.labels)})
+
+    @classmethod
+    def from_sklearn(cls, model, schema=MULTIPLE_SCHEMA):
+        """Splits a fitted LinearRegression whose columns are the one-hot block then the numerics."""
+        k = len(schema['categories'])
+        coef = np.ravel(model.coef_)
+        if len(coef) != k + len(schema['numeric']):
+            raise ValueError(f"Model has {len(coef)} coefficients but the schema describes {k + len(schema['numeric'])}")
+        return cls(model.intercept_, coef[:k], coef[k:], schema)
+
+    def category_index(self, names):
+        """Maps category names or labels to indices (vectorized); unknown names map to -1."""
+        keys = pd.Series(np.asarray(names, dtype=object).ravel()).astype(str)
+        keys = keys.str.lower().str.replace(' ', '', regex=False)
+        return keys.map(self._index).fillna(-1).to_numpy(dtype=np.int64)
+
+    def validate(self, category_idx, numeric):
+        """Vectorized input checks; returns a per-row array of error messages ('' when valid)."""
+        category_idx = np.asarray(category_idx).ravel()
+        numeric = np.asarray(numeric, dtype=float).reshape(len(category_idx), len(self.numeric))
+        errors = np.full(len(category_idx), '', dtype=object)
+        errors[(category_idx < 0) | (category_idx >= len(self.categories))] = f"Unknown {self.schema['categorical']}"
+        errors[np.isnan(numeric).any(axis=1)] = "Missing value"
+        errors[(numeric < 0).any(axis=1)] = "Values must not be negative"
+        errors[np.isinf(numeric).any(axis=1)] = "Values must be finite"
+        return errors
+
+    def predict_one(self, category_idx, numeric):
+        """Scores one input by gathering its category coefficient directly."""
+        return self.intercept + self.category_coef[category_idx] + float(np.dot(self.numeric_coef, numeric))
+
+    def design_matrix(self, category_idx, numeric):
+        """Builds the sparse CSR design matrix: one stored entry for the category plus the numerics."""
+        category_idx = np.asarray(category_idx, dtype=np.int64).ravel()
+        numeric = np.asarray(numeric, dtype=float).reshape(len(category_idx), len(self.numeric))
+        n, k, m = len(category_idx), len(self.categories), len(self.numeric)
+        # Each row stores 1 + m entries: the active category, then every numeric column
+        data = np.hstack([np.ones((n, 1)), numeric]).ravel()
+        indices = np.empty((n, 1 + m), dtype=np.int64)
+        indices[:, 0] = category_idx
+        indices[:, 1:] = np.arange(k, k + m)
+        indptr = np.arange(0, n * (1 + m) + 1, 1 + m)
+        return sp.csr_matrix((data, indices.ravel(), indptr), shape=(n, k + m))
+
+    def predict(self, category_idx, numeric):
+        """Scores a batch: numeric columns in one matrix-vector product plus a coefficient gather."""
+        category_idx = np.asarray(category_idx, dtype=np.int64).ravel()
+        numeric = np.asarray(numeric, dtype=float).reshape(len(category_idx), len(self.numeric))
+        return numeric @ self.numeric_coef + self.category_coef[category_idx] + self.intercept
+
+    def predict_sparse(self, design):
+        """Scores a prebuilt sparse design matrix (see design_matrix) in one multiply."""
+        return design @ self._coef + self.intercept
+
+
+def normalize_category(name):
+    return str(name).lower().replace(' ', '')
+
+
+def load_indexed_multiple(models, schema=MULTIPLE_SCHEMA):
+    """Builds the indexed view of models['multiple'], or None when it is not loaded."""
+    if models.get('multiple') is None:
+        return None
+    return IndexedLinearModel.from_sklearn(models['multiple'], schema)
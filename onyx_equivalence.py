@@ -0,0 +1,308 @@
+"""Differential equivalence harness for every inference backend.
+
+Each model has a reference backend, "sklearn_row": the per-request estimator
+predict call the app pages make. Every other scoring path in the repo (batched
+sklearn, the NDJSON stream, the indexed encoder, contribution sums, scenario
+rescoring and the float64/float32 bulk kernels) is run on the same inputs and
+compared with an np.isclose-style check, |out - ref| <= atol + rtol * |ref|.
+Each backend has its own tolerance. Latency per backend (best of --repeat
+runs) is recorded in the same run, so speed and correctness are reported
+together.
+
+Two corpora are checked:
+- golden: fixed inputs with reference outputs stored in golden_outputs.json.
+  These catch changes in the artifacts or in sklearn itself.
+- random: --random rows per model drawn from the training ranges (and a
+  little beyond), compared with the sklearn_row reference of the same run.
+
+The exit status is 1 when any backend is out of tolerance.
+
+Usage:
+    python onyx_equivalence.py --random 2000 --tolerance bulk_float32=1e-5:1.0
+    python onyx_equivalence.py --write-golden
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from onyx_bulk import BulkKernel
+from onyx_contributions import frame_contributions
+from onyx_drift import TRAINING_RANGES
+from onyx_encoding import load_indexed_multiple
+from onyx_models import BASE_PATH, LOCATIONS, MODEL_NAMES, PREDICTORS, load_models, model_available, multiple_row
+from onyx_scenarios import ScenarioTable
+from onyx_stream import parse_line, score_batch
+
+GOLDEN_PATH = os.path.join(BASE_PATH, 'golden_outputs.json')
+REFERENCE_BACKEND = 'sklearn_row'
+
+# Backend -> (rtol, atol); anything not listed uses 'default'
+TOLERANCES = {
+    'default': (1e-9, 1e-6),
+    'bulk_float32': (1e-5, 1.0),
+}
+
+
+# ----- BACKENDS ------------------------------
+# Each backend takes the models dict and a corpus frame (stream field names) and returns predictions.
+
+def _sklearn_row(name):
+    def run(models, frame):
+        if name == 'simple':
+            return np.array([models['simple'].predict([[h]])[0] for h in frame['hours']])
+        if name == 'polynomial':
+            return np.array([
+                models['poly_lin_reg'].predict(models['poly_transformer'].transform([[level]]))[0]
+                for level in frame['level']
+            ])
+        return np.array([models['multiple'].predict(np.array([multiple_row(r)]))[0] for r in frame.to_dict('records')])
+    return run
+
+
+def _sklearn_batch(name):
+    def run(models, frame):
+        if name == 'multiple':
+            return PREDICTORS[name](models, np.array([multiple_row(r) for r in frame.to_dict('records')]))
+        return PREDICTORS[name](models, frame[frame.columns[0]].to_numpy(dtype=float))
+    return run
+
+
+def _stream(name):
+    def run(models, frame):
+        lines = [json.dumps(dict(record, model=name)) for record in frame.to_dict('records')]
+        return np.array([result['prediction'] for result in score_batch(models, [parse_line(line) for line in lines])])
+    return run
+
+
+def _bulk(name, dtype):
+    def run(models, frame):
+        kernel = BulkKernel(name, models, dtype)
+        return kernel.score(kernel.prepare(frame), 4096).astype(float)
+    return run
+
+
+def _contributions(name):
+    def run(models, frame):
+        return frame_contributions(name, models, frame)[1].sum(axis=1)
+    return run
+
+
+def _indexed(mode):
+    def run(models, frame):
+        profit_model = load_indexed_multiple(models)
+        location_idx = profit_model.category_index(frame['location'])
+        numeric = frame[profit_model.numeric].to_numpy(dtype=float)
+        if mode == 'one':
+            return np.array([profit_model.predict_one(i, row) for i, row in zip(location_idx, numeric)])
+        if mode == 'sparse':
+            return profit_model.predict_sparse(profit_model.design_matrix(location_idx, numeric))
+        return profit_model.predict(location_idx, numeric)
+    return run
+
+
+def _scenarios(models, frame):
+    profit_model = load_indexed_multiple(models)
+    table = ScenarioTable.from_frame(frame, profit_model)
+    table.rescore(profit_model)
+    return table.prediction
+
+
+def backends(name):
+    """Every scoring path available for a model, reference first."""
+    found = {
+        REFERENCE_BACKEND: _sklearn_row(name),
+        'sklearn_batch': _sklearn_batch(name),
+        'stream': _stream(name),
+        'bulk_float64': _bulk(name, np.float64),
+        'bulk_float32': _bulk(name, np.float32),
+    }
+    if name in ('polynomial', 'multiple'):
+        found['contributions'] = _contributions(name)
+    if name == 'multiple':
+        found['indexed_one'] = _indexed('one')
+        found['indexed_batch'] = _indexed('batch')
+        found['indexed_sparse'] = _indexed('sparse')
+        found['scenarios'] = _scenarios
+    return found
+
+
+# ----- CORPORA ------------------------------
+def golden_inputs():
+    """Fixed inputs: the widget grid, the training-range edges and a few points beyond them."""
+    hours = np.concatenate([np.arange(1.0, 10.5, 0.5), [0.0, 0.25, 10.5, 12.0]])
+    levels = np.concatenate([np.arange(1.0, 10.25, 0.25), [0.0, 0.5, 10.5, 11.0]])
+    spends = [
+        (0.0, 0.0, 0.0),
+        (100000.0, 100000.0, 100000.0),
+        TRAINING_RANGES['rd'][1:] + TRAINING_RANGES['admin'][1:] + TRAINING_RANGES['marketing'][1:],
+        TRAINING_RANGES['rd'][:1] + TRAINING_RANGES['admin'][:1] + TRAINING_RANGES['marketing'][:1],
+        (12345.67, 98765.43, 250000.5),
+        (1e6, 5e5, 2e6),
+    ]
+    multiple = pd.DataFrame(
+        [(location, *spend) for location in LOCATIONS for spend in spends],
+        columns=['location', 'rd', 'admin', 'marketing']
+    )
+    return {
+        'simple': pd.DataFrame({'hours': hours}),
+        'polynomial': pd.DataFrame({'level': levels}),
+        'multiple': multiple,
+    }
+
+
+def random_inputs(n, seed=0):
+    """n rows per model, drawn uniformly from 10% beyond each side of the training ranges."""
+    rng = np.random.default_rng(seed)
+
+    def draw(feature):
+        low, high = TRAINING_RANGES[feature]
+        margin = 0.1 * (high - low)
+        return np.maximum(rng.uniform(low - margin, high + margin, n), 0.0)
+
+    return {
+        'simple': pd.DataFrame({'hours': draw('hours')}),
+        'polynomial': pd.DataFrame({'level': draw('level')}),
+        'multiple': pd.DataFrame({
+            'location': rng.choice(LOCATIONS, n),
+            'rd': draw('rd'),
+            'admin': draw('admin'),
+            'marketing': draw('marketing'),
+        }),
+    }
+
+
+def write_golden(models, path=GOLDEN_PATH):
+    corpus = {}
+    for name, frame in golden_inputs().items():
+        if model_available(models, name):
+            corpus[name] = {
+                'inputs': frame.to_dict('list'),
+                'outputs': backends(name)[REFERENCE_BACKEND](models, frame).tolist(),
+            }
+    golden = {'sklearn_version': sklearn.__version__, 'numpy_version': np.__version__, 'models': corpus}
+    with open(path, 'w') as f:
+        json.dump(golden, f, indent=2)
+    return golden
+
+
+def load_golden(path=GOLDEN_PATH):
+    """Returns {model: (input frame, expected outputs)} from the golden corpus file."""
+    with open(path) as f:
+        golden = json.load(f)
+    return {
+        name: (pd.DataFrame(entry['inputs']), np.asarray(entry['outputs'], dtype=float))
+        for name, entry in golden['models'].items()
+    }
+
+
+# ----- COMPARISON ------------------------------
+def compare(models, name, corpus, frame, expected=None, tolerances=TOLERANCES, repeat=3):
+    """Runs every backend on frame and returns one result row per backend.
+
+    When expected is None the reference backend's output of this run is used.
+    """
+    rows = []
+    found = backends(name)
+    outputs = {}
+    for backend, run in found.items():
+        best, error = np.inf, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                outputs[backend] = np.asarray(run(models, frame), dtype=float)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            best = min(best, time.perf_counter() - start)
+        rows.append({'model': name, 'corpus': corpus, 'backend': backend, 'rows': len(frame),
+                     'error': error, 'us_per_row': 1e6 * best / max(len(frame), 1)})
+
+    reference = expected if expected is not None else outputs.get(REFERENCE_BACKEND)
+    for row in rows:
+        rtol, atol = tolerances.get(row['backend'], tolerances['default'])
+        output = outputs.get(row['backend'])
+        if row['error'] is not None or reference is None:
+            row.update(max_abs_diff=np.nan, max_rel_diff=np.nan, passed=False)
+            continue
+        if output.shape != reference.shape:
+            row.update(max_abs_diff=np.nan, max_rel_diff=np.nan, passed=False,
+                       error=f"Returned {output.shape[0]} outputs for {reference.shape[0]} rows")
+            continue
+        diff = np.abs(output - reference)
+        row.update(
+            max_abs_diff=float(diff.max(initial=0.0)),
+            max_rel_diff=float((diff / np.maximum(np.abs(reference), np.finfo(float).tiny)).max(initial=0.0)),
+            passed=bool(np.all(diff <= atol + rtol * np.abs(reference))),
+        )
+    return rows
+
+
+def parse_tolerances(values):
+    tolerances = dict(TOLERANCES)
+    for value in values:
+        backend, _, spec = value.partition('=')
+        rtol, _, atol = spec.partition(':')
+        default_rtol, default_atol = tolerances.get(backend, tolerances['default'])
+        tolerances[backend] = (float(rtol) if rtol else default_rtol, float(atol) if atol else default_atol)
+    return tolerances
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every inference backend against sklearn and the golden corpus.")
+    parser.add_argument('--models', nargs='+', choices=MODEL_NAMES, default=list(MODEL_NAMES))
+    parser.add_argument('--random', type=int, default=1000, help="Random rows per model (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per backend; the fastest is reported")
+    parser.add_argument('--tolerance', action='append', default=[], metavar='BACKEND=RTOL[:ATOL]',
+                        help="Override a backend's tolerance ('default' for all others)")
+    parser.add_argument('--golden', default=GOLDEN_PATH, help="Golden corpus location")
+    parser.add_argument('--write-golden', action='store_true', help="Regenerate the golden corpus from sklearn and exit")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args(argv)
+    if args.random < 0 or args.repeat < 1:
+        parser.error("--random must be >= 0 and --repeat >= 1")
+    try:
+        tolerances = parse_tolerances(args.tolerance)
+    except ValueError:
+        parser.error("--tolerance must look like BACKEND=RTOL[:ATOL]")
+
+    models = load_models()
+    if args.write_golden:
+        golden = write_golden(models, args.golden)
+        print(f"Wrote {sum(len(m['outputs']) for m in golden['models'].values())} golden outputs to {args.golden}")
+        return 0
+
+    golden = load_golden(args.golden) if os.path.exists(args.golden) else {}
+    random = random_inputs(args.random, args.seed) if args.random else {}
+    results = []
+    for name in args.models:
+        if not model_available(models, name):
+            print(f"Skipping {name}: model not available")
+            continue
+        if name in golden:
+            frame, expected = golden[name]
+            results += compare(models, name, 'golden', frame, expected, tolerances, args.repeat)
+        if name in random:
+            results += compare(models, name, 'random', random[name], None, tolerances, args.repeat)
+
+    report = pd.DataFrame(results)
+    failed = int((~report['passed']).sum()) if len(report) else 0
+    if args.json:
+        print(report.to_json(orient='records', indent=2))
+    else:
+        columns = ['model', 'corpus', 'backend', 'rows', 'max_abs_diff', 'max_rel_diff', 'us_per_row', 'passed']
+        print(report[columns].to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+        for row in results:
+            if row['error']:
+                print(f"{row['model']}/{row['corpus']}/{row['backend']}: {row['error']}")
+        print(f"\n{len(report) - failed} of {len(report)} backend checks within tolerance")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
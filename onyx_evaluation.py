@@ -0,0 +1,278 @@
+"""Streaming accuracy evaluation of the models on labeled holdout data.
+
+A CSV or Parquet file is read in fixed-size chunks, and each chunk is scored
+in one vectorized call. Chunk statistics are merged into running aggregates
+with the parallel (Chan et al.) form of Welford's update, so R², RMSE, MAE and
+bias come out of a single pass without the cancellation of sum-of-squares
+formulas. Residuals also fill a histogram whose range widens to fit every
+chunk, and the profit model is additionally sliced by location. Memory use
+depends on the chunk size, never on the file size.
+
+Inputs use the onyx_stream.py field names (hours, level, or location plus
+rd, admin, marketing); the label column defaults to "actual", as in feedback
+records.
+
+Usage:
+    python onyx_evaluation.py holdout.parquet --model multiple --target profit
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from onyx_encoding import load_indexed_multiple
+from onyx_models import MODEL_NAMES, MULTIPLE_SCHEMA, PREDICTORS, load_models, model_available
+
+CHUNK_ROWS = 100000
+HISTOGRAM_BINS = 40
+TARGET_COLUMN = 'actual'
+
+
+def input_columns(kind, schema=MULTIPLE_SCHEMA):
+    if kind == 'simple':
+        return ['hours']
+    if kind == 'polynomial':
+        return ['level']
+    return [schema['categorical']] + list(schema['numeric'])
+
+
+def _parquet_file(source):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Reading Parquet files requires pyarrow") from None
+    return pq.ParquetFile(source)
+
+
+def _is_parquet(source):
+    name = source if isinstance(source, str) else getattr(source, 'name', '')
+    return name.endswith('.parquet')
+
+
+def file_columns(source):
+    """Column names of a CSV or Parquet path or file object, without reading the rows."""
+    if _is_parquet(source):
+        return list(_parquet_file(source).schema_arrow.names)
+    columns = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return columns
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, columns=None):
+    """Yields DataFrames of at most chunk_rows rows from a CSV or Parquet path or file object."""
+    if _is_parquet(source):
+        for batch in _parquet_file(source).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, usecols=columns)
+
+
+def _moments(values):
+    mean = float(values.mean())
+    return len(values), mean, float(np.dot(values - mean, values - mean))
+
+
+def _merge_moments(count, mean, m2, batch):
+    """Chan et al. merge of (count, mean, M2) with a batch's own moments."""
+    n, batch_mean, batch_m2 = batch
+    total = count + n
+    delta = batch_mean - mean
+    mean += delta * n / total
+    m2 += batch_m2 + delta * delta * count * n / total
+    return total, mean, m2
+
+
+class RegressionMetrics:
+    """Single-pass R², RMSE, MAE and bias over chunks of (actual, predicted)."""
+
+    def __init__(self):
+        self.count = 0
+        self.target_mean = self.target_m2 = 0.0
+        self.residual_mean = self.residual_m2 = 0.0
+        self.abs_error = 0.0
+        self.max_abs_error = 0.0
+
+    def update(self, actual, predicted):
+        actual = np.asarray(actual, dtype=float)
+        residual = actual - np.asarray(predicted, dtype=float)
+        if not len(residual):
+            return
+        count = self.count
+        _, self.target_mean, self.target_m2 = _merge_moments(count, self.target_mean, self.target_m2, _moments(actual))
+        self.count, self.residual_mean, self.residual_m2 = _merge_moments(
+            count, self.residual_mean, self.residual_m2, _moments(residual)
+        )
+        abs_residual = np.abs(residual)
+        self.abs_error += float(abs_residual.sum())
+        self.max_abs_error = max(self.max_abs_error, float(abs_residual.max()))
+
+    def summary(self):
+        if not self.count:
+            return {'rows': 0, 'r2': np.nan, 'rmse': np.nan, 'mae': np.nan, 'bias': np.nan, 'max_abs_error': np.nan}
+        # Sum of squared residuals, recovered from their mean and M2
+        sse = self.residual_m2 + self.count * self.residual_mean ** 2
+        return {
+            'rows': self.count,
+            'r2': 1 - sse / self.target_m2 if self.target_m2 > 0 else np.nan,
+            'rmse': (sse / self.count) ** 0.5,
+            'mae': self.abs_error / self.count,
+            'bias': -self.residual_mean,  # mean of predicted - actual
+            'max_abs_error': self.max_abs_error,
+        }
+
+
+class ResidualHistogram:
+    """Fixed number of equal bins centered on zero whose range doubles to fit every residual.
+
+    The first chunk sets the half-width (rounded up to 1, 2 or 5 x 10^k). When a
+    later residual falls outside, the range doubles and adjacent bin pairs merge
+    into the middle half, as often as needed. Counts stay exact and nothing
+    overflows, whatever order the residuals arrive in.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        if bins % 4:
+            raise ValueError("The residual histogram needs a multiple of 4 bins")
+        self.bins = bins
+        self.edges = None
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, residual):
+        residual = np.asarray(residual, dtype=float)
+        if not len(residual):
+            return
+        spread = float(np.abs(residual).max())
+        if self.edges is None:
+            spread = spread or 1.0
+            # Round the half-width up to 1, 2 or 5 x 10^k so the bin edges read well
+            scale = 10 ** np.floor(np.log10(spread))
+            limit = next(m * scale for m in (1, 2, 5, 10) if m * scale >= spread)
+            self.edges = np.linspace(-limit, limit, self.bins + 1)
+        while spread > self.edges[-1]:
+            self._double()
+        counts, _ = np.histogram(residual, bins=self.edges)
+        self.counts += counts
+
+    def _double(self):
+        # Old bins 2i and 2i+1 become new bin bins/4 + i; the outer quarters start empty
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.counts[self.bins // 4:self.bins // 4 + len(merged)] = merged
+        self.edges = np.linspace(2 * self.edges[0], 2 * self.edges[-1], self.bins + 1)
+
+    def to_frame(self):
+        if self.edges is None:
+            return pd.DataFrame({'count': []})
+        centers = (self.edges[:-1] + self.edges[1:]) / 2
+        return pd.DataFrame({'count': self.counts}, index=pd.Index(centers, name='residual'))
+
+
+def score_chunk(kind, models, frame, target, schema=MULTIPLE_SCHEMA):
+    """Scores the valid rows of one chunk; returns (valid mask, actual, predicted, slice labels)."""
+    actual = pd.to_numeric(frame[target], errors='coerce').to_numpy(dtype=float)
+    if kind == 'multiple':
+        profit_model = load_indexed_multiple(models, schema)
+        location_idx = profit_model.category_index(frame[schema['categorical']])
+        numeric = frame[profit_model.numeric].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = (profit_model.validate(location_idx, numeric) == '') & np.isfinite(actual)
+        predicted = profit_model.predict(location_idx[valid], numeric[valid])
+        labels = np.asarray(profit_model.labels, dtype=object)[location_idx[valid]]
+        return valid, actual[valid], predicted, labels
+    x = pd.to_numeric(frame[input_columns(kind)[0]], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(x) & np.isfinite(actual)
+    # The sklearn models refuse empty input, so a chunk with no valid rows is scored as empty
+    predicted = PREDICTORS[kind](models, x[valid]) if valid.any() else np.empty(0)
+    return valid, actual[valid], predicted, None
+
+
+class Evaluation:
+    """Overall metrics, residual histogram and per-slice metrics accumulated chunk by chunk."""
+
+    def __init__(self, kind, bins=HISTOGRAM_BINS):
+        self.kind = kind
+        self.overall = RegressionMetrics()
+        self.residuals = ResidualHistogram(bins)
+        self.slices = {}
+        self.skipped = 0
+
+    def update(self, valid, actual, predicted, labels=None):
+        self.skipped += int((~valid).sum())
+        self.overall.update(actual, predicted)
+        self.residuals.update(actual - predicted)
+        if labels is not None:
+            for label in pd.unique(labels):
+                mask = labels == label
+                self.slices.setdefault(label, RegressionMetrics()).update(actual[mask], predicted[mask])
+
+    def slices_frame(self):
+        if not self.slices:
+            return pd.DataFrame()
+        frame = pd.DataFrame({label: m.summary() for label, m in sorted(self.slices.items())}).T
+        return frame.astype({'rows': int})
+
+
+def evaluate(kind, models, chunks, target=TARGET_COLUMN, schema=MULTIPLE_SCHEMA, bins=HISTOGRAM_BINS):
+    """Streams chunks through a model and yields the running Evaluation after each one."""
+    if kind not in MODEL_NAMES or not model_available(models, kind):
+        raise ValueError(f"Model '{kind}' is not available")
+    evaluation = Evaluation(kind, bins)
+    for frame in chunks:
+        missing = [c for c in input_columns(kind, schema) + [target] if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        evaluation.update(*score_chunk(kind, models, frame, target, schema))
+        yield evaluation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a model on a labeled holdout file, chunk by chunk.")
+    parser.add_argument('data', help="Labeled CSV or Parquet file")
+    parser.add_argument('--model', choices=MODEL_NAMES, required=True)
+    parser.add_argument('--target', default=TARGET_COLUMN, help="Label column (default: actual)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args(argv)
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows must be positive")
+
+    columns = input_columns(args.model) + [args.target]
+    evaluation = None
+    try:
+        for evaluation in evaluate(args.model, load_models(), iter_chunks(args.data, args.chunk_rows, columns),
+                                   args.target):
+            pass
+    except ValueError as e:
+        parser.error(str(e))
+    if evaluation is None:
+        parser.error("No input rows")
+
+    summary = dict(evaluation.overall.summary(), skipped=evaluation.skipped)
+    residuals = evaluation.residuals
+    if args.json:
+        print(json.dumps({
+            'model': args.model,
+            'overall': summary,
+            'slices': {label: m.summary() for label, m in evaluation.slices.items()},
+            'residual_histogram': {
+                'edges': [] if residuals.edges is None else residuals.edges.tolist(),
+                'counts': residuals.counts.tolist(),
+            },
+        }, indent=2, default=float))
+        return
+
+    for key, value in summary.items():
+        print(f"{key:<14} {value:,}" if isinstance(value, int) else f"{key:<14} {value:,.4g}")
+    if evaluation.slices:
+        print("\nBy location:")
+        print(evaluation.slices_frame().to_string(float_format=lambda v: f"{v:,.4g}"))
+    print("\nResiduals (actual - predicted):")
+    frame = residuals.to_frame()
+    peak = max(int(frame['count'].max()), 1)
+    for center, count in frame['count'].items():
+        print(f"{center:>14,.4g} | {'#' * int(round(50 * count / peak))} {count:,}")
+
+
+if __name__ == '__main__':
+    main()
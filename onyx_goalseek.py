@@ -0,0 +1,83 @@
+import numpy as np
+
+# ----- GOAL SEEK: SOLVE FOR THE INPUT THAT HITS A TARGET -------------------------
+# The linear models invert in closed form. The polynomial model is inverted by
+# finding the real roots of p(x) - target for every target at once, using the
+# eigenvalues of a stack of companion matrices.
+
+
+def solve_simple(model, targets):
+    """Study hours needed for each target mark: x = (target - intercept) / slope.
+
+    Non-finite targets return NaN.
+    """
+    targets = np.asarray(targets, dtype=float).ravel()
+    slope = float(np.ravel(model.coef_)[0])
+    if slope == 0:
+        return np.full(len(targets), np.nan)
+    return np.where(np.isfinite(targets), (targets - float(model.intercept_)) / slope, np.nan)
+
+
+def solve_multiple(profit_model, targets, solve_for, location_idx, numeric):
+    """Spend on one numeric feature needed for each target profit, holding the others fixed.
+
+    location_idx and numeric are broadcast against targets, so a single scenario
+    can be solved for a whole column of targets. Non-finite targets return NaN.
+    """
+    targets = np.asarray(targets, dtype=float).ravel()
+    j = profit_model.numeric.index(solve_for)
+    coef_j = profit_model.numeric_coef[j]
+    if coef_j == 0:
+        return np.full(len(targets), np.nan)
+    numeric = np.broadcast_to(np.asarray(numeric, dtype=float), (len(targets), len(profit_model.numeric)))
+    location_idx = np.broadcast_to(np.asarray(location_idx, dtype=np.int64), (len(targets),))
+    others = numeric @ profit_model.numeric_coef - numeric[:, j] * coef_j
+    fixed = profit_model.intercept + profit_model.category_coef[location_idx] + others
+    return np.where(np.isfinite(targets), (targets - fixed) / coef_j, np.nan)
+
+
+def polynomial_coefficients(transformer, lin_reg):
+    """Collapses a 1-feature PolynomialFeatures + LinearRegression pair into p(x) = sum c[k] x**k."""
+    powers = np.asarray(transformer.powers_)
+    if powers.shape[1] != 1:
+        raise ValueError("Goal seek supports polynomial models of a single input feature")
+    coefficients = np.zeros(int(powers.max()) + 1)
+    np.add.at(coefficients, powers[:, 0], np.ravel(lin_reg.coef_))
+    coefficients[0] += float(lin_reg.intercept_)
+    return coefficients
+
+
+def solve_polynomial(transformer, lin_reg, targets, low, high):
+    """Level needed for each target salary: the smallest real root of p(x) - target in [low, high].
+
+    Targets with no real solution inside the range, and non-finite targets, return NaN.
+    """
+    targets = np.asarray(targets, dtype=float).ravel()
+    levels = np.full(len(targets), np.nan)
+    coefficients = np.trim_zeros(polynomial_coefficients(transformer, lin_reg), 'b')
+    degree = len(coefficients) - 1
+    # eigvals rejects the whole stack if any matrix holds a NaN or inf, so blank targets are left out
+    finite = np.isfinite(targets)
+    if degree < 1 or not finite.any():
+        return levels
+
+    # Monic companion matrix of p(x) - target, one per target; only the constant term differs
+    monic = coefficients / coefficients[-1]
+    companion = np.zeros((int(finite.sum()), degree, degree))
+    companion[:, 1:, :-1] = np.eye(degree - 1)
+    companion[:, :, -1] = -monic[:-1]
+    companion[:, 0, -1] = -(coefficients[0] - targets[finite]) / coefficients[-1]
+    roots = np.linalg.eigvals(companion)
+
+    real = np.abs(roots.imag) <= 1e-7 * np.maximum(1.0, np.abs(roots.real))
+    tol = 1e-9 * max(1.0, abs(low), abs(high))
+    in_range = (roots.real >= low - tol) & (roots.real <= high + tol)
+    solution = np.where(real & in_range, roots.real, np.inf).min(axis=1)
+    levels[finite] = np.where(np.isfinite(solution), np.clip(solution, low, high), np.nan)
+    return levels
+
+
+def targets_from_frame(frame):
+    """Reads the targets from a 'target' column, or from the first column of an uploaded CSV."""
+    column = 'target' if 'target' in frame.columns else frame.columns[0]
+    return frame[column].to_numpy(dtype=float)
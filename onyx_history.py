@@ -0,0 +1,101 @@
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ----- BOUNDED PER-SESSION PREDICTION HISTORY -------------------------
+# Each page keeps its recent predictions in a fixed-capacity ring buffer of
+# preallocated NumPy arrays (timestamp, inputs, prediction), so appending never
+# allocates and old rows are simply overwritten. A session holds one buffer per
+# page in a HistoryStore that never allocates beyond its byte ceiling. When a
+# new page would not fit, the least recently used page's buffer is dropped.
+
+HISTORY_CAPACITY = int(os.environ.get('ONYX_HISTORY_SIZE', 50))
+HISTORY_MAX_BYTES = int(os.environ.get('ONYX_HISTORY_MAX_BYTES', 32 * 1024))
+
+
+class RingHistory:
+    """The last `capacity` predictions of one page, oldest overwritten first."""
+
+    def __init__(self, columns, capacity=HISTORY_CAPACITY):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity)
+        self._inputs = np.zeros((capacity, len(self.columns)))
+        self._predictions = np.zeros(capacity)
+        self._next = 0
+        self._count = 0
+
+    @staticmethod
+    def row_bytes(n_columns):
+        """Bytes one stored prediction takes: timestamp, inputs and prediction as float64."""
+        return (n_columns + 2) * np.dtype(float).itemsize
+
+    @property
+    def nbytes(self):
+        return self._timestamps.nbytes + self._inputs.nbytes + self._predictions.nbytes
+
+    def __len__(self):
+        return self._count
+
+    def append(self, inputs, prediction, timestamp=None):
+        i = self._next
+        self._timestamps[i] = time.time() if timestamp is None else timestamp
+        self._inputs[i] = inputs
+        self._predictions[i] = prediction
+        self._next = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _order(self):
+        # Oldest first: once the buffer is full the oldest row sits at the write position
+        start = self._next if self._count == self.capacity else 0
+        return (start + np.arange(self._count)) % self.capacity
+
+    def arrays(self):
+        """Returns (timestamps, inputs, predictions) in chronological order (copies)."""
+        order = self._order()
+        return self._timestamps[order], self._inputs[order], self._predictions[order]
+
+    def to_frame(self):
+        timestamps, inputs, predictions = self.arrays()
+        frame = pd.DataFrame(inputs, columns=self.columns)
+        frame.insert(0, 'time', pd.to_datetime(timestamps, unit='s'))
+        frame['prediction'] = predictions
+        return frame
+
+    def clear(self):
+        self._next = self._count = 0
+
+
+class HistoryStore:
+    """One RingHistory per page under a strict per-session byte ceiling."""
+
+    def __init__(self, max_bytes=HISTORY_MAX_BYTES, capacity=HISTORY_CAPACITY):
+        self.max_bytes = max_bytes
+        self.capacity = capacity
+        self._histories = OrderedDict()  # page key -> RingHistory, least recently used first
+
+    @property
+    def nbytes(self):
+        return sum(history.nbytes for history in self._histories.values())
+
+    def get(self, key, columns):
+        """Returns the page's history, creating one that fits in the remaining budget."""
+        history = self._histories.get(key)
+        if history is not None and history.columns == list(columns):
+            self._histories.move_to_end(key)
+            return history
+        self._histories.pop(key, None)
+
+        row_bytes = RingHistory.row_bytes(len(columns))
+        wanted = min(self.capacity, self.max_bytes // row_bytes)
+        if wanted < 1:
+            raise ValueError(f"History ceiling of {self.max_bytes} bytes cannot hold one row")
+        while self._histories and self.nbytes + wanted * row_bytes > self.max_bytes:
+            self._histories.popitem(last=False)
+        history = self._histories[key] = RingHistory(columns, wanted)
+        return history
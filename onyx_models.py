@@ -0,0 +1,115 @@
+import os
+import pickle
+
+import numpy as np
+
+# ----- HEADLESS MODEL LOADING AND VECTORIZED SCORING -------------------------
+# Shared by the command-line tools, which cannot rely on Streamlit's caching.
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+MODEL_FILES = {
+    'simple': 'simple.pkl',
+    'poly_transformer': 'polynomial_transformer.pkl',
+    'poly_lin_reg': 'linear_model.pkl',
+    'multiple': 'model.pkl',
+}
+
+# Feature metadata for model.pkl: a one-hot categorical block followed by the numeric columns
+MULTIPLE_SCHEMA = {
+    'categorical': 'location',
+    'categories': ['california', 'newyork', 'florida'],
+    'category_labels': ['California', 'New York', 'Florida'],
+    'numeric': ['rd', 'admin', 'marketing'],
+    'numeric_labels': ['R&D Spend', 'Administration Spend', 'Marketing Spend'],
+}
+
+# Column order model.pkl was trained with (same order as the app's user_input dict)
+LOCATIONS = MULTIPLE_SCHEMA['categories']
+MULTIPLE_FEATURES = LOCATIONS + MULTIPLE_SCHEMA['numeric']
+
+# Public model names accepted by the scoring helpers
+MODEL_NAMES = ('simple', 'polynomial', 'multiple')
+
+
+def load_models(base_path=BASE_PATH):
+    """Loads every pickled model, using None for any artifact that fails to load."""
+    models = {}
+    for key, filename in MODEL_FILES.items():
+        try:
+            with open(os.path.join(base_path, filename), 'rb') as f:
+                models[key] = pickle.load(f)
+        except Exception:
+            models[key] = None
+    return models
+
+
+def predict_simple(models, hours):
+    """Predicts marks for an array of study hours in one call."""
+    hours = np.asarray(hours, dtype=float).reshape(-1, 1)
+    return models['simple'].predict(hours)
+
+
+def predict_polynomial(models, levels):
+    """Predicts salaries for an array of position levels in one call."""
+    levels = np.asarray(levels, dtype=float).reshape(-1, 1)
+    return models['poly_lin_reg'].predict(models['poly_transformer'].transform(levels))
+
+
+def predict_multiple(models, rows):
+    """Predicts profits for an (n, 6) array ordered like MULTIPLE_FEATURES."""
+    rows = np.asarray(rows, dtype=float).reshape(-1, len(MULTIPLE_FEATURES))
+    return models['multiple'].predict(rows)
+
+
+PREDICTORS = {
+    'simple': predict_simple,
+    'polynomial': predict_polynomial,
+    'multiple': predict_multiple,
+}
+
+
+def model_available(models, name):
+    """Returns True when every artifact behind a public model name loaded."""
+    if name == 'polynomial':
+        return models.get('poly_transformer') is not None and models.get('poly_lin_reg') is not None
+    return models.get(name) is not None
+
+
+def finite_value(record, key):
+    """Reads one numeric input, rejecting NaN and infinities (which json.loads accepts)."""
+    try:
+        value = float(record[key])
+    except OverflowError:
+        # Integers too large for a float (json.loads keeps them exact)
+        value = float('inf')
+    if not np.isfinite(value):
+        raise ValueError(f"Field '{key}' must be a finite number")
+    return value
+
+
+def multiple_row(record):
+    """Builds one model.pkl input row from a location name or one-hot flags."""
+    location = record.get('location')
+    if location is not None:
+        location = str(location).lower().replace(' ', '')
+        if location not in LOCATIONS:
+            raise ValueError(f"Unknown location: {record.get('location')}")
+        flags = [1.0 if loc == location else 0.0 for loc in LOCATIONS]
+    else:
+        flags = [finite_value(record, loc) if loc in record else 0.0 for loc in LOCATIONS]
+        if any(flag not in (0.0, 1.0) for flag in flags) or sum(flags) != 1:
+            raise ValueError("Please select exactly ONE location")
+    return flags + [finite_value(record, key) for key in ('rd', 'admin', 'marketing')]
+
+
+def record_features(record):
+    """Extracts the model name and its input row from one request record."""
+    name = record.get('model')
+    if name not in MODEL_NAMES:
+        raise ValueError(f"Unknown model: {name!r} (expected one of {', '.join(MODEL_NAMES)})")
+    if name == 'simple':
+        return name, finite_value(record, 'hours')
+    if name == 'polynomial':
+        return name, finite_value(record, 'level')
+    return name, multiple_row(record)
@@ -0,0 +1,238 @@
+"""Online recursive-least-squares (RLS) updates of the linear models from labeled feedback.
+
+Each model keeps RLS state (coefficients plus inverse-covariance matrix P) over
+its features and an intercept term. A labeled record updates that state in
+O(d^2). The refreshed coefficients are then published by swapping a new
+estimator object into the shared models dict, so predictions already running
+keep the object they started with and nothing waits on the update. State is
+checkpointed atomically every --checkpoint-every records, together with a
+digest of the shipped coefficients it started from. A checkpoint whose digest
+no longer matches (the artifact was retrained and promoted) is ignored.
+
+Labels are untrusted input: records with non-finite values, or whose label is
+more than MAX_ERROR_STD prior standard deviations from the current prediction,
+are rejected before they touch the state.
+
+Apply a file of feedback records (NDJSON in the onyx_stream.py request format
+plus an "actual" field) to the checkpointed state:
+    python onyx_online.py feedback.ndjson
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from onyx_drift import TRAINING_RANGES
+from onyx_models import BASE_PATH, MULTIPLE_SCHEMA, load_models, model_available, record_features
+
+ONLINE_DIR = os.environ.get('ONYX_ONLINE_DIR', os.path.join(BASE_PATH, 'online_state'))
+
+# Public model name -> key of the linear estimator that RLS updates
+ESTIMATOR_KEYS = {'simple': 'simple', 'polynomial': 'poly_lin_reg', 'multiple': 'multiple'}
+
+# How far (in target units) a prediction may plausibly be off before any feedback
+PRIOR_STD = {'simple': 10.0, 'polynomial': 50000.0, 'multiple': 20000.0}
+
+# Labels further than this many prior standard deviations from the prediction are rejected
+MAX_ERROR_STD = float(os.environ.get('ONYX_ONLINE_MAX_ERROR_STD', 10.0))
+
+
+class RLSState:
+    """Recursive least squares over x = [features..., 1] with an optional forgetting factor."""
+
+    def __init__(self, theta, P, forgetting=1.0, updates=0):
+        self.theta = np.asarray(theta, dtype=float)
+        self.P = np.asarray(P, dtype=float)
+        self.forgetting = float(forgetting)
+        self.updates = int(updates)
+
+    @classmethod
+    def from_linear(cls, model, feature_scale, prior_std, forgetting=1.0):
+        """Starts from a fitted model's coefficients.
+
+        The prior covariance is scaled per feature so that moving any coefficient by
+        one prior standard deviation shifts a typical prediction by about prior_std.
+        """
+        theta = np.append(np.ravel(model.coef_), float(model.intercept_))
+        scale = np.append(np.asarray(feature_scale, dtype=float), 1.0)
+        P = np.diag((prior_std / scale) ** 2)
+        return cls(theta, P, forgetting)
+
+    def update(self, x, y):
+        """Applies one labeled record in O(d^2) and returns the prior prediction error."""
+        x = np.append(np.asarray(x, dtype=float), 1.0)
+        y = float(y)
+        if not (np.isfinite(x).all() and np.isfinite(y)):
+            raise ValueError("Feedback inputs and label must be finite numbers")
+        Px = self.P @ x
+        gain = Px / (self.forgetting + x @ Px)
+        error = y - float(self.theta @ x)
+        self.theta = self.theta + gain * error
+        P = (self.P - np.outer(gain, Px)) / self.forgetting
+        self.P = (P + P.T) / 2  # keep P symmetric against rounding drift
+        self.updates += 1
+        return error
+
+    def to_model(self, template):
+        """Returns a copy of template carrying the current coefficients."""
+        model = copy.copy(template)
+        model.coef_ = self.theta[:-1].copy()
+        model.intercept_ = float(self.theta[-1])
+        return model
+
+
+def artifact_digest(model):
+    """Digest of a fitted linear model's coefficients, identifying the artifact RLS started from."""
+    digest = hashlib.sha256(np.ascontiguousarray(np.ravel(model.coef_), dtype=float).tobytes())
+    digest.update(np.float64(model.intercept_).tobytes())
+    return digest.hexdigest()
+
+
+def feature_scales(models):
+    """Typical magnitude of every model input, taken from the training ranges."""
+    scales = {
+        'simple': [TRAINING_RANGES['hours'][1]],
+        'multiple': [1.0] * len(MULTIPLE_SCHEMA['categories'])
+                    + [TRAINING_RANGES[name][1] for name in MULTIPLE_SCHEMA['numeric']],
+    }
+    if model_available(models, 'polynomial'):
+        top = np.abs(models['poly_transformer'].transform([[TRAINING_RANGES['level'][1]]])[0])
+        scales['polynomial'] = np.where(top > 0, top, 1.0)
+    return scales
+
+
+class OnlineUpdater:
+    """Keeps RLS state per linear model and publishes updated coefficients into `models`."""
+
+    def __init__(self, models, state_dir=ONLINE_DIR, checkpoint_every=100, prior_std=PRIOR_STD, forgetting=1.0,
+                 max_error_std=MAX_ERROR_STD):
+        self.models = models
+        self.state_dir = state_dir
+        self.checkpoint_every = checkpoint_every
+        self.prior_std = prior_std
+        self.max_error_std = max_error_std
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._digests = {}
+        self._states = {}
+        self._versions = {}
+        self._pending = 0
+
+        scales = feature_scales(models)
+        for name, key in ESTIMATOR_KEYS.items():
+            if not model_available(models, name):
+                continue
+            self._templates[name] = models[key]
+            self._digests[name] = artifact_digest(models[key])
+            state = self._load_checkpoint(name)
+            if state is None:
+                state = RLSState.from_linear(models[key], scales[name], prior_std[name], forgetting)
+            self._states[name] = state
+            self._versions[name] = 0
+            if state.updates:
+                self._publish(name)
+
+    @property
+    def names(self):
+        return tuple(self._states)
+
+    def version(self, name):
+        """Number of times new coefficients were published for a model (0 = shipped artifact)."""
+        return self._versions.get(name, 0)
+
+    def updates(self, name):
+        return self._states[name].updates
+
+    def feature_vector(self, name, features):
+        """Maps a prediction input (hours, level or a model.pkl row) to the RLS feature vector."""
+        if name == 'polynomial':
+            return self.models['poly_transformer'].transform([[float(features)]])[0]
+        return np.atleast_1d(np.asarray(features, dtype=float))
+
+    def validate(self, name, x, actual):
+        """Raises ValueError for a label too far from the current prediction to be plausible."""
+        state = self._states[name]
+        limit = self.max_error_std * self.prior_std[name]
+        if abs(actual - float(state.theta @ np.append(x, 1.0))) > limit:
+            raise ValueError(f"The label is more than {limit:,.0f} away from the prediction; rejected as implausible")
+
+    def learn(self, name, features, actual):
+        """Absorbs one labeled record, publishes the new coefficients and returns the prior error."""
+        x = self.feature_vector(name, features)
+        actual = float(actual)
+        with self._lock:
+            self.validate(name, x, actual)
+            error = self._states[name].update(x, actual)
+            self._publish(name)
+            self._pending += 1
+            if self.checkpoint_every and self._pending >= self.checkpoint_every:
+                self._checkpoint()
+        return error
+
+    def checkpoint(self):
+        """Writes every model's RLS state to disk now."""
+        with self._lock:
+            self._checkpoint()
+
+    def _publish(self, name):
+        # Assigning a dict slot is atomic: readers see either the old or the new estimator
+        self.models[ESTIMATOR_KEYS[name]] = self._states[name].to_model(self._templates[name])
+        self._versions[name] += 1
+
+    def _checkpoint(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        for name, state in self._states.items():
+            path = os.path.join(self.state_dir, f'{name}.npz')
+            tmp = path + '.tmp.npz'
+            np.savez(tmp, theta=state.theta, P=state.P, forgetting=state.forgetting, updates=state.updates,
+                     artifact=self._digests[name])
+            os.replace(tmp, path)
+        self._pending = 0
+
+    def _load_checkpoint(self, name):
+        path = os.path.join(self.state_dir, f'{name}.npz')
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            # Checkpoints from before a retrain (or without a digest) would override the new artifact
+            if 'artifact' not in data or str(data['artifact']) != self._digests[name]:
+                return None
+            if data['theta'].shape != (len(np.ravel(self._templates[name].coef_)) + 1,):
+                return None
+            if not (np.isfinite(data['theta']).all() and np.isfinite(data['P']).all()):
+                return None
+            return RLSState(data['theta'], data['P'], data['forgetting'], data['updates'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply labeled feedback to the online RLS state.")
+    parser.add_argument('feedback', help="NDJSON file of prediction requests with an 'actual' field")
+    parser.add_argument('--state-dir', default=ONLINE_DIR, help="Checkpoint directory")
+    parser.add_argument('--checkpoint-every', type=int, default=1000, help="Records between checkpoints")
+    parser.add_argument('--max-error-std', type=float, default=MAX_ERROR_STD,
+                        help="Reject labels further than this many prior standard deviations from the prediction")
+    args = parser.parse_args(argv)
+
+    updater = OnlineUpdater(load_models(), args.state_dir, args.checkpoint_every, max_error_std=args.max_error_std)
+    applied = skipped = 0
+    with open(args.feedback) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                name, features = record_features(record)
+                updater.learn(name, features, float(record['actual']))
+                applied += 1
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+    updater.checkpoint()
+    print(f"Applied {applied} feedback record(s), skipped {skipped}; state saved to {args.state_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# ----- SPEND-ALLOCATION OPTIMIZER FOR THE PROFIT MODEL -------------------------
+# Predicted profit is linear in the spends, so maximizing it under a total budget
+# and per-category bounds is a fractional knapsack with unit weights: after every
+# category gets its lower bound, the remaining budget goes to categories in
+# descending coefficient order until each hits its upper bound. That greedy fill
+# is exact, and it is vectorized across any number of budget scenarios.
+
+
+def optimize_allocation(profit_model, budgets, lower, upper, location_idx=None, spend_all=True):
+    """Solves every budget scenario exactly in one vectorized pass.
+
+    budgets is (n,); lower and upper broadcast to (n, m) per-category bounds.
+    location_idx broadcasts to (n,); None picks the most profitable location.
+    With spend_all the whole budget is allocated; otherwise categories whose
+    coefficient is not positive receive only their lower bound.
+
+    Returns (allocation, location_idx, profit, feasible); infeasible rows are NaN.
+    """
+    budgets = np.asarray(budgets, dtype=float).ravel()
+    n, m = len(budgets), len(profit_model.numeric)
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), (n, m))
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), (n, m))
+    if location_idx is None:
+        location_idx = int(np.argmax(profit_model.category_coef))
+    location_idx = np.broadcast_to(np.asarray(location_idx, dtype=np.int64), (n,))
+
+    allocation = lower.copy()
+    remaining = budgets - lower.sum(axis=1)
+    headroom = upper - lower
+    feasible = (remaining >= 0) & (headroom >= 0).all(axis=1)
+    if spend_all:
+        feasible &= remaining <= headroom.sum(axis=1)
+
+    for j in np.argsort(-profit_model.numeric_coef, kind='stable'):
+        if not spend_all and profit_model.numeric_coef[j] <= 0:
+            break
+        add = np.clip(remaining, 0.0, headroom[:, j])
+        allocation[:, j] += add
+        remaining -= add
+
+    profit = profit_model.predict(location_idx, allocation)
+    allocation[~feasible] = np.nan
+    profit[~feasible] = np.nan
+    return allocation, location_idx, profit, feasible
+
+
+def optimize_frame(profit_model, frame, lower, upper, spend_all=True):
+    """Batch API over a DataFrame of scenarios.
+
+    Requires a 'budget' column. Optional 'location' and '<feature>_min' /
+    '<feature>_max' columns override the location choice and default bounds per row.
+    """
+    n = len(frame)
+    lower = np.array(np.broadcast_to(np.asarray(lower, dtype=float), (n, len(profit_model.numeric))))
+    upper = np.array(np.broadcast_to(np.asarray(upper, dtype=float), (n, len(profit_model.numeric))))
+    for j, name in enumerate(profit_model.numeric):
+        if f'{name}_min' in frame.columns:
+            lower[:, j] = frame[f'{name}_min'].to_numpy(dtype=float)
+        if f'{name}_max' in frame.columns:
+            upper[:, j] = frame[f'{name}_max'].to_numpy(dtype=float)
+
+    location_idx = None
+    if 'location' in frame.columns:
+        location_idx = profit_model.category_index(frame['location'])
+        if (location_idx < 0).any():
+            raise ValueError(f"Unknown location(s): {sorted(set(frame['location'][location_idx < 0]))}")
+
+    allocation, location_idx, profit, feasible = optimize_allocation(
+        profit_model, frame['budget'].to_numpy(dtype=float), lower, upper, location_idx, spend_all
+    )
+    result = pd.DataFrame({'budget': frame['budget'].to_numpy(dtype=float)})
+    result['location'] = np.asarray(profit_model.labels, dtype=object)[location_idx]
+    for j, name in enumerate(profit_model.numeric):
+        result[name] = allocation[:, j]
+    result['predicted_profit'] = profit
+    result['feasible'] = feasible
+    return result
@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from onyx_models import BASE_PATH
+
+# ----- ON-DEMAND SAMPLING PROFILER FOR SINGLE RERUNS -------------------------
+# A background thread samples the script thread's Python stack at a fixed
+# interval and counts identical stacks. Nothing is started unless profiling is
+# enabled for the session, so a disabled profiler costs nothing. Profiles are
+# saved in the collapsed-stack format ("root;caller;callee count") that
+# speedscope and flamegraph.pl read directly, next to a JSON sidecar with the
+# page name and inputs of the profiled rerun.
+
+PROFILE_DIR = os.environ.get('ONYX_PROFILE_DIR', os.path.join(BASE_PATH, 'profiles'))
+MAX_PROFILES = 50
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds until stopped."""
+
+    def __init__(self, thread_id=None, interval=0.002):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.started = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='onyx-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Returns the profile in collapsed-stack format, one stack per line."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def save_profile(profiler, page, inputs, directory=PROFILE_DIR):
+    """Writes <stamp>-<page>.collapsed plus a .json sidecar and returns the metadata."""
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^a-z0-9]+', '-', page.lower()).strip('-') or 'page'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}"
+    metadata = {
+        'name': name,
+        'page': page,
+        'inputs': inputs,
+        'samples': sum(profiler.samples.values()),
+        'interval_ms': profiler.interval * 1000,
+        'duration_ms': profiler.duration * 1000,
+        'created': time.time(),
+    }
+    with open(os.path.join(directory, f'{name}.collapsed'), 'w') as f:
+        f.write(profiler.collapsed())
+    with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+    _prune(directory)
+    return metadata
+
+
+def recent_profiles(names, directory=PROFILE_DIR, limit=10):
+    """Metadata of the newest of the given saved profiles, newest first.
+
+    Profiles pruned in the meantime (by any session) are skipped.
+    """
+    profiles = []
+    for name in sorted(names, reverse=True)[:limit]:
+        try:
+            with open(os.path.join(directory, f'{name}.json')) as f:
+                metadata = json.load(f)
+        except FileNotFoundError:
+            continue
+        metadata['path'] = os.path.join(directory, f"{name}.collapsed")
+        profiles.append(metadata)
+    return profiles
+
+
+def read_profile(metadata):
+    """Collapsed stacks of a saved profile, or None once it has been pruned."""
+    try:
+        with open(metadata['path']) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _prune(directory):
+    names = sorted(f[:-len('.json')] for f in os.listdir(directory) if f.endswith('.json'))
+    for name in names[:-MAX_PROFILES]:
+        for suffix in ('.json', '.collapsed'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
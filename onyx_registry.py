@@ -0,0 +1,151 @@
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from onyx_models import BASE_PATH
+
+# ----- MANIFEST-DRIVEN MODEL REGISTRY -------------------------
+# models_manifest.json lists every servable model: its kind (simple, polynomial
+# or multiple), artifact files keyed like the app's `models` dict, feature
+# schema and page metadata. Artifacts load on first use. Entries marked
+# "default" form the production models dict and stay resident. Every other
+# variant lives in an LRU that evicts the least recently used entries once
+# their artifacts exceed the memory budget.
+
+MANIFEST_PATH = os.environ.get('ONYX_MODEL_MANIFEST', os.path.join(BASE_PATH, 'models_manifest.json'))
+
+KINDS = ('simple', 'polynomial', 'multiple')
+REQUIRED_ARTIFACTS = {
+    'simple': ('simple',),
+    'polynomial': ('poly_transformer', 'poly_lin_reg'),
+    'multiple': ('multiple',),
+}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Reads and validates the manifest."""
+    with open(path) as f:
+        manifest = json.load(f)
+    names = set()
+    default_kinds = set()
+    for entry in manifest['models']:
+        if entry['name'] in names:
+            raise ValueError(f"Duplicate model name in manifest: {entry['name']}")
+        names.add(entry['name'])
+        if entry['kind'] not in KINDS:
+            raise ValueError(f"Unknown kind for {entry['name']}: {entry['kind']}")
+        missing = set(REQUIRED_ARTIFACTS[entry['kind']]) - set(entry['artifacts'])
+        if missing:
+            raise ValueError(f"{entry['name']} is missing artifacts: {', '.join(sorted(missing))}")
+        if entry.get('default'):
+            if entry['kind'] in default_kinds:
+                raise ValueError(f"More than one default model of kind {entry['kind']}")
+            default_kinds.add(entry['kind'])
+    return manifest
+
+
+class ModelRegistry:
+    """Loads manifest entries on first use and keeps non-default ones within a memory budget."""
+
+    def __init__(self, manifest_path=MANIFEST_PATH, memory_budget_bytes=None):
+        self.manifest = load_manifest(manifest_path)
+        self.base_path = os.path.dirname(os.path.abspath(manifest_path))
+        if memory_budget_bytes is None:
+            budget_mb = float(os.environ.get('ONYX_MODEL_MEMORY_MB', self.manifest.get('memory_budget_mb', 256)))
+            memory_budget_bytes = int(budget_mb * 1024 * 1024)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.entries = list(self.manifest['models'])
+        self._by_name = {entry['name']: entry for entry in self.entries}
+        self._by_title = {entry['page']['title']: entry for entry in self.entries}
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # name -> (models dict, bytes)
+        self.production = {}
+        self._production_loaded = set()
+        self.errors = {}
+        self.loads = self.hits = self.evictions = 0
+
+    def entry(self, name):
+        return self._by_name[name]
+
+    def entry_for_page(self, title):
+        """Returns the manifest entry behind a sidebar page title, or None for other pages."""
+        return self._by_title.get(title)
+
+    def page_titles(self):
+        return [entry['page']['title'] for entry in self.entries]
+
+    def defaults(self):
+        return [entry for entry in self.entries if entry.get('default')]
+
+    def names(self, kind=None):
+        return [entry['name'] for entry in self.entries if kind is None or entry['kind'] == kind]
+
+    def get(self, name):
+        """Returns the entry's models dict (same layout as onyx_models.load_models), loading it if needed."""
+        entry = self._by_name[name]
+        with self._lock:
+            if entry.get('default'):
+                if name not in self._production_loaded:
+                    self.production.update(self._load(entry)[0])
+                    self._production_loaded.add(name)
+                else:
+                    self.hits += 1
+                return self.production
+
+            if name in self._lru:
+                self._lru.move_to_end(name)
+                self.hits += 1
+                return self._lru[name][0]
+
+            models, size = self._load(entry)
+            self._lru[name] = (models, size)
+            self._evict(keep=name)
+            return models
+
+    def production_models(self):
+        """Loads every default entry and returns the shared production models dict."""
+        for entry in self.defaults():
+            self.get(entry['name'])
+        return self.production
+
+    def stats(self):
+        with self._lock:
+            return {
+                'resident': list(self._lru),
+                'resident_bytes': sum(size for _, size in self._lru.values()),
+                'budget_bytes': self.memory_budget_bytes,
+                'loads': self.loads,
+                'hits': self.hits,
+                'evictions': self.evictions,
+            }
+
+    def _load(self, entry):
+        models, size, errors = {}, 0, []
+        for key, filename in entry['artifacts'].items():
+            path = os.path.join(self.base_path, filename)
+            try:
+                with open(path, 'rb') as f:
+                    models[key] = pickle.load(f)
+                size += os.path.getsize(path)
+            except Exception as e:
+                models[key] = None
+                errors.append(f"Could not load {filename}: {e}")
+        if errors:
+            self.errors[entry['name']] = errors
+        else:
+            self.errors.pop(entry['name'], None)
+        self.loads += 1
+        return models, size
+
+    def _evict(self, keep):
+        # Pickled artifact size is used as the in-memory footprint estimate
+        total = sum(size for _, size in self._lru.values())
+        while total > self.memory_budget_bytes and len(self._lru) > 1:
+            name = next(iter(self._lru))
+            if name == keep:
+                break
+            _, size = self._lru.pop(name)
+            total -= size
+            self.evictions += 1
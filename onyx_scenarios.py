@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from onyx_models import MULTIPLE_SCHEMA
+
+# ----- EDITABLE SCENARIO TABLE FOR THE MULTIPLE MODEL -------------------------
+# Scenario inputs and predictions live in NumPy arrays kept in the session.
+# Edits reported by st.data_editor are applied as deltas, so only the rows that
+# changed are re-scored (in one vectorized call through the indexed encoder);
+# every other row keeps its cached prediction. The table remembers which
+# published coefficients its predictions came from, and every row is re-scored
+# when online learning publishes new ones.
+
+SPEND_COLUMNS = MULTIPLE_SCHEMA['numeric']
+
+
+class ScenarioTable:
+    """Scenario grid state: location index, spends and the cached prediction per row."""
+
+    def __init__(self, location_idx, spend):
+        self.location_idx = np.array(location_idx, dtype=np.int64)
+        self.spend = np.array(spend, dtype=float).reshape(-1, len(SPEND_COLUMNS))
+        self.prediction = np.full(len(self.location_idx), np.nan)
+        self.version = 0
+        self.last_rescored = 0
+        self.model_version = None
+
+    @classmethod
+    def from_frame(cls, frame, encoder):
+        """Builds a table from a DataFrame with location, rd, admin and marketing columns."""
+        location_idx = encoder.category_index(frame['location'])
+        if (location_idx < 0).any():
+            raise ValueError(f"Unknown location(s): {sorted(set(frame['location'][location_idx < 0]))}")
+        return cls(location_idx, frame[SPEND_COLUMNS].to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self.location_idx)
+
+    def rescore(self, encoder, rows=None):
+        """Re-scores the given row indices (all rows when None) in one vectorized call."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        valid = rows[encoder.validate(self.location_idx[rows], self.spend[rows]) == '']
+        self.prediction[rows] = np.nan
+        if len(valid):
+            self.prediction[valid] = encoder.predict(self.location_idx[valid], self.spend[valid])
+        self.last_rescored = len(rows)
+
+    def sync(self, encoder, model_version):
+        """Re-scores every row if the model's coefficients changed since the table was scored."""
+        if model_version == self.model_version:
+            return False
+        self.rescore(encoder)
+        self.model_version = model_version
+        self.version += 1
+        return True
+
+    def apply_edits(self, encoder, edits):
+        """Applies a data_editor delta (edited, deleted and added rows) and re-scores only those rows."""
+        changed = []
+        for row, values in edits.get('edited_rows', {}).items():
+            row = int(row)
+            self._set_row(encoder, row, values)
+            changed.append(row)
+
+        deleted = sorted(int(row) for row in edits.get('deleted_rows', []))
+        if deleted:
+            keep = np.ones(len(self), dtype=bool)
+            keep[deleted] = False
+            # Shift surviving edited rows to their post-deletion positions
+            changed = [row - int(np.searchsorted(deleted, row)) for row in changed if keep[row]]
+            self.location_idx = self.location_idx[keep]
+            self.spend = self.spend[keep]
+            self.prediction = self.prediction[keep]
+
+        added = edits.get('added_rows', [])
+        if added:
+            start = len(self)
+            self.location_idx = np.concatenate([self.location_idx, np.full(len(added), -1, dtype=np.int64)])
+            self.spend = np.vstack([self.spend, np.full((len(added), len(SPEND_COLUMNS)), np.nan)])
+            self.prediction = np.concatenate([self.prediction, np.full(len(added), np.nan)])
+            for offset, values in enumerate(added):
+                self._set_row(encoder, start + offset, values)
+            changed.extend(range(start, start + len(added)))
+
+        self.rescore(encoder, changed)
+        self.version += 1
+
+    def _set_row(self, encoder, row, values):
+        for column, value in values.items():
+            if column == 'location':
+                self.location_idx[row] = -1 if value is None else encoder.category_index([value])[0]
+            elif column in SPEND_COLUMNS:
+                self.spend[row, SPEND_COLUMNS.index(column)] = np.nan if value is None else float(value)
+
+    def to_frame(self, encoder):
+        """Returns the table as the DataFrame shown in the editor."""
+        labels = np.array(encoder.labels + [None], dtype=object)
+        frame = pd.DataFrame({'location': labels[self.location_idx]})
+        for i, column in enumerate(SPEND_COLUMNS):
+            frame[column] = self.spend[:, i]
+        frame['prediction'] = self.prediction
+        return frame
+
+
+def default_scenarios(encoder):
+    """Starts each session with one scenario per location at the page's default spends."""
+    k = len(encoder.categories)
+    table = ScenarioTable(np.arange(k), np.full((k, len(SPEND_COLUMNS)), 100000.0))
+    table.rescore(encoder)
+    return table
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+
+import numpy as np
+
+from onyx_models import BASE_PATH, MODEL_NAMES, PREDICTORS, load_models, model_available
+
+# ----- SHADOW EVALUATION OF CANDIDATE MODELS -------------------------
+# Production predictions are mirrored to candidate artifacts on a background
+# thread. Submitting never blocks: when the queue is full the shadow work is
+# dropped and counted, so users never wait on the candidate.
+
+SHADOW_DIR = os.environ.get('ONYX_SHADOW_DIR', os.path.join(BASE_PATH, 'candidates'))
+
+
+class ShadowStats:
+    """Streaming comparison of production vs candidate outputs in bounded memory."""
+
+    def __init__(self, reservoir_size=2048, seed=0):
+        self.count = 0
+        self.dropped = 0
+        self.non_finite = 0
+        self.sum_abs_diff = 0.0
+        self.max_abs_diff = 0.0
+        self.sum_diff = 0.0
+        self._reservoir = np.empty(reservoir_size)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, production, candidate):
+        """Folds a batch of paired outputs into the aggregates; non-finite pairs are only counted."""
+        diff = np.asarray(candidate, dtype=float) - np.asarray(production, dtype=float)
+        finite = np.isfinite(diff)
+        self.non_finite += int((~finite).sum())
+        diff = diff[finite]
+        abs_diff = np.abs(diff)
+        self.sum_diff += float(diff.sum())
+        self.sum_abs_diff += float(abs_diff.sum())
+        self.max_abs_diff = max(self.max_abs_diff, float(abs_diff.max(initial=0.0)))
+
+        # Reservoir sampling (Algorithm R) for the whole batch at once: the i-th value seen
+        # overall fills slot i while the reservoir has room, then replaces a random slot in
+        # [0, i] if that slot falls inside the reservoir
+        size = len(self._reservoir)
+        seen = self.count + np.arange(len(abs_diff))
+        slots = np.where(seen < size, seen, self._rng.integers(0, seen + 1))
+        keep = slots < size
+        # Later values win when two land on the same slot, as in the sequential algorithm
+        slots, values = slots[keep][::-1], abs_diff[keep][::-1]
+        slots, last = np.unique(slots, return_index=True)
+        self._reservoir[slots] = values[last]
+        self.count += len(abs_diff)
+
+    def summary(self):
+        sample = self._reservoir[:min(self.count, len(self._reservoir))]
+        p50, p90, p99 = np.percentile(sample, [50, 90, 99]) if len(sample) else (np.nan,) * 3
+        return {
+            'compared': self.count,
+            'dropped': self.dropped,
+            'non_finite': self.non_finite,
+            'mean_diff': self.sum_diff / self.count if self.count else np.nan,
+            'mean_abs_diff': self.sum_abs_diff / self.count if self.count else np.nan,
+            'max_abs_diff': self.max_abs_diff,
+            'p50_abs_diff': float(p50),
+            'p90_abs_diff': float(p90),
+            'p99_abs_diff': float(p99),
+        }
+
+
+class ShadowEvaluator:
+    """Mirrors production predictions to candidate models off the request path."""
+
+    def __init__(self, candidate_models, max_queue=1024, max_batch=256, reservoir_size=2048):
+        self.candidate_models = candidate_models
+        self.models = tuple(name for name in MODEL_NAMES if model_available(candidate_models, name))
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {name: ShadowStats(reservoir_size) for name in self.models}
+        self._worker = threading.Thread(target=self._run, name='onyx-shadow', daemon=True)
+        self._worker.start()
+
+    def submit(self, name, features, production):
+        """Queues one production prediction for shadow scoring; never blocks."""
+        if name not in self._stats:
+            return False
+        try:
+            self._queue.put_nowait((name, features, float(production)))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats[name].dropped += 1
+            return False
+
+    def summary(self):
+        """Returns the current aggregates for every shadowed model."""
+        with self._lock:
+            return {name: stats.summary() for name, stats in self._stats.items()}
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Drain whatever else is waiting so candidates score in one vectorized call
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            groups = {}
+            for name, features, production in items:
+                groups.setdefault(name, ([], []))
+                groups[name][0].append(features)
+                groups[name][1].append(production)
+
+            for name, (features, production) in groups.items():
+                try:
+                    candidate = PREDICTORS[name](self.candidate_models, np.array(features))
+                except Exception:
+                    with self._lock:
+                        self._stats[name].dropped += len(features)
+                    continue
+                with self._lock:
+                    self._stats[name].update(production, candidate)
+
+
+def create_shadow_evaluator(shadow_dir=SHADOW_DIR, **kwargs):
+    """Builds an evaluator from candidate artifacts, or returns None when there are none."""
+    if not os.path.isdir(shadow_dir):
+        return None
+    candidates = load_models(shadow_dir)
+    if not any(model_available(candidates, name) for name in MODEL_NAMES):
+        return None
+    return ShadowEvaluator(candidates, **kwargs)
@@ -0,0 +1,196 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# ----- MONTE CARLO PROFIT SIMULATION -------------------------
+# Each spend is fixed or drawn from a normal, uniform or triangular
+# distribution. Samples are drawn and scored in chunks, one vectorized
+# IndexedLinearModel.predict call per chunk. A chunk returns only fixed-size
+# aggregates (histogram counts, sums, extremes), so millions of samples never
+# sit in memory. Because profit is linear in the spends, its full range is
+# known before sampling, and the histogram bins are fixed up front. Chunks
+# can therefore be merged in any order, from one process or from a pool, and
+# running percentiles are read off the cumulative histogram after every chunk.
+# Pool workers are started with forkserver (or spawn), never fork: the app
+# server has background threads whose locks a forked child would inherit.
+
+DISTRIBUTIONS = ('fixed', 'normal', 'uniform', 'triangular')
+HISTOGRAM_BINS = 2000
+NORMAL_SPAN = 6.0  # standard deviations covered by the histogram range
+
+_worker_model = None
+
+
+def validate_distribution(spec):
+    """Checks one spend spec.
+
+    Specs are ('fixed', value), ('normal', mean, std), ('uniform', low, high)
+    or ('triangular', low, mode, high).
+    """
+    kind, *params = spec
+    expected = {'fixed': 1, 'normal': 2, 'uniform': 2, 'triangular': 3}.get(kind)
+    if expected is None:
+        raise ValueError(f"Unknown distribution: {kind}")
+    if len(params) != expected:
+        raise ValueError(f"A {kind} spend takes {expected} parameter(s)")
+    if kind == 'normal' and params[1] < 0:
+        raise ValueError("Standard deviation must not be negative")
+    if kind == 'uniform' and params[0] > params[1]:
+        raise ValueError("Uniform low must not exceed high")
+    if kind == 'triangular' and not params[0] <= params[1] <= params[2]:
+        raise ValueError("Triangular parameters must satisfy low <= mode <= high")
+    if min(params) < 0 and kind != 'normal':
+        raise ValueError("Spends must not be negative")
+
+
+def support(spec):
+    """(low, high) range a spend can take; normal spends are clipped at zero."""
+    kind, *params = spec
+    if kind == 'fixed':
+        return params[0], params[0]
+    if kind == 'normal':
+        mean, std = params
+        return max(mean - NORMAL_SPAN * std, 0.0), max(mean + NORMAL_SPAN * std, 0.0)
+    return params[0], params[-1]
+
+
+def draw(spec, n, rng):
+    kind, *params = spec
+    if kind == 'fixed':
+        return np.full(n, float(params[0]))
+    if kind == 'normal':
+        return np.maximum(rng.normal(params[0], params[1], n), 0.0)
+    if kind == 'uniform':
+        return rng.uniform(params[0], params[1], n)
+    low, mode, high = params
+    if low == high:
+        return np.full(n, float(low))
+    return rng.triangular(low, mode, high, n)
+
+
+def profit_range(profit_model, specs, location_idx):
+    """Smallest and largest profit the specs can produce, used as the histogram range."""
+    lows, highs = np.array([support(spec) for spec in specs]).T
+    coef = profit_model.numeric_coef
+    base = profit_model.intercept + profit_model.category_coef[location_idx]
+    low = base + np.where(coef >= 0, coef * lows, coef * highs).sum()
+    high = base + np.where(coef >= 0, coef * highs, coef * lows).sum()
+    if high <= low:
+        high = low + 1.0
+    return float(low), float(high)
+
+
+class ProfitDistribution:
+    """Running aggregates of simulated profits over a fixed histogram range."""
+
+    def __init__(self, low, high, bins=HISTOGRAM_BINS):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.low = np.inf
+        self.high = -np.inf
+        self.losses = 0
+
+    def chunk_stats(self, profits):
+        """Aggregates one chunk of profits into a small, mergeable tuple."""
+        bins = len(self.counts)
+        slot = ((profits - self.edges[0]) / (self.edges[-1] - self.edges[0]) * bins).astype(np.int64)
+        counts = np.bincount(np.clip(slot, 0, bins - 1), minlength=bins)
+        return (counts, len(profits), float(profits.sum()), float(np.dot(profits, profits)),
+                float(profits.min()), float(profits.max()), int((profits < 0).sum()))
+
+    def merge(self, stats):
+        counts, n, total, total_sq, low, high, losses = stats
+        self.counts += counts
+        self.count += n
+        self.total += total
+        self.total_sq += total_sq
+        self.low = min(self.low, low)
+        self.high = max(self.high, high)
+        self.losses += losses
+
+    def percentiles(self, qs):
+        """Percentiles (0-100) interpolated within histogram bins, accurate to one bin width."""
+        cdf = np.concatenate([[0.0], np.cumsum(self.counts)]) / max(self.count, 1)
+        values = np.interp(np.asarray(qs, dtype=float) / 100, cdf, self.edges)
+        return np.clip(values, self.low, self.high)
+
+    def summary(self):
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean ** 2, 0.0)
+        p5, p25, p50, p75, p95 = self.percentiles([5, 25, 50, 75, 95]).tolist()
+        return {
+            'samples': self.count,
+            'mean': mean,
+            'std': variance ** 0.5,
+            'min': self.low,
+            'p5': p5,
+            'p25': p25,
+            'p50': p50,
+            'p75': p75,
+            'p95': p95,
+            'max': self.high,
+            'prob_loss': self.losses / self.count,
+        }
+
+    def histogram(self, bins=50):
+        """Counts re-binned to `bins` equal bins between the observed min and max, with bin centers."""
+        edges = np.linspace(self.low, self.high, bins + 1) if self.high > self.low else self.edges[[0, -1]]
+        centers = (self.edges[:-1] + self.edges[1:]) / 2
+        counts, _ = np.histogram(centers, bins=edges, weights=self.counts)
+        return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def simulate_chunk(profit_model, specs, location_idx, n, seed, low, high, bins):
+    """Draws and scores one chunk of n samples and returns its aggregates."""
+    rng = np.random.default_rng(seed)
+    spend = np.column_stack([draw(spec, n, rng) for spec in specs])
+    profits = profit_model.predict(np.full(n, location_idx), spend)
+    return ProfitDistribution(low, high, bins).chunk_stats(profits)
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _init_worker(profit_model):
+    global _worker_model
+    _worker_model = profit_model
+
+
+def _worker_chunk(args):
+    return simulate_chunk(_worker_model, *args)
+
+
+def simulate(profit_model, specs, location_idx, samples, chunk_size=250000, workers=1, seed=0, bins=HISTOGRAM_BINS):
+    """Runs the simulation chunk by chunk, yielding the running ProfitDistribution after each one."""
+    for spec in specs:
+        validate_distribution(spec)
+    if len(specs) != len(profit_model.numeric):
+        raise ValueError(f"Expected {len(profit_model.numeric)} spend distributions, got {len(specs)}")
+    low, high = profit_range(profit_model, specs, location_idx)
+    result = ProfitDistribution(low, high, bins)
+
+    sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(specs, location_idx, n, chunk_seed, low, high, bins) for n, chunk_seed in zip(sizes, seeds)]
+
+    if workers <= 1:
+        for task in tasks:
+            result.merge(simulate_chunk(profit_model, *task))
+            yield result
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                               initializer=_init_worker, initargs=(profit_model,))
+    try:
+        for future in as_completed([pool.submit(_worker_chunk, task) for task in tasks]):
+            result.merge(future.result())
+            yield result
+    finally:
+        # A run closed early (e.g. the user left the page) drops its queued chunks instead of waiting for them
+        pool.shutdown(wait=True, cancel_futures=True)
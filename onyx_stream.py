@@ -0,0 +1,129 @@
+"""Streams NDJSON prediction requests from stdin to stdout in micro-batches.
+
+Each input line is a JSON object naming a model plus its inputs, e.g.
+
+    {"model": "simple", "hours": 5}
+    {"model": "polynomial", "level": 6}
+    {"model": "multiple", "location": "florida", "rd": 100000, "admin": 100000, "marketing": 100000}
+
+Records are buffered until either --batch-size records are waiting or the oldest
+one has waited --flush-interval seconds, then each model scores its share of the
+batch in one vectorized call. Results are written one line per input, in input
+order; an optional "id" field is echoed back.
+
+Usage:
+    cat requests.ndjson | python onyx_stream.py --batch-size 512 --flush-interval 0.05
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from onyx_models import PREDICTORS, load_models, model_available, record_features
+
+_EOF = object()
+
+
+def _read_lines(stream, lines):
+    """Feeds stdin lines into a bounded queue so the reader never outruns scoring."""
+    for line in stream:
+        if line.strip():
+            lines.put(line)
+    lines.put(_EOF)
+
+
+def score_batch(models, batch):
+    """Scores a list of parsed records, grouped by model, and returns one result dict per record."""
+    results = [None] * len(batch)
+    groups = {}
+    for i, (record_id, name, features, error) in enumerate(batch):
+        result = {} if record_id is None else {'id': record_id}
+        if error is None and not model_available(models, name):
+            error = f"Model '{name}' is not available"
+        if error is not None:
+            result['error'] = error
+        else:
+            result['model'] = name
+            groups.setdefault(name, []).append(i)
+        results[i] = result
+
+    for name, indices in groups.items():
+        try:
+            predictions = PREDICTORS[name](models, np.array([batch[i][2] for i in indices]))
+        except Exception as e:
+            for i in indices:
+                results[i]['error'] = str(e)
+            continue
+        for i, value in zip(indices, predictions.tolist()):
+            results[i]['prediction'] = value
+    return results
+
+
+def parse_line(line):
+    """Parses one NDJSON line into (id, model name, features, error)."""
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("Each line must be a JSON object")
+    except ValueError as e:
+        return None, None, None, f"Invalid JSON: {e}"
+    record_id = record.get('id')
+    try:
+        name, features = record_features(record)
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        message = f"Missing field: {e.args[0]}" if isinstance(e, KeyError) else str(e)
+        return record_id, record.get('model'), None, message
+    return record_id, name, features, None
+
+
+def run(models, stdin, stdout, batch_size=256, flush_interval=0.05):
+    """Runs the streaming loop until stdin is exhausted; returns the number of records written."""
+    lines = queue.Queue(maxsize=2 * batch_size)
+    reader = threading.Thread(target=_read_lines, args=(stdin, lines), daemon=True)
+    reader.start()
+
+    batch = []
+    deadline = None
+    written = 0
+    done = False
+    while not done:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            line = lines.get(timeout=timeout)
+        except queue.Empty:
+            line = None
+        if line is _EOF:
+            done = True
+        elif line is not None:
+            batch.append(parse_line(line))
+            if deadline is None:
+                deadline = time.monotonic() + flush_interval
+
+        if batch and (done or len(batch) >= batch_size or time.monotonic() >= deadline):
+            for result in score_batch(models, batch):
+                stdout.write(json.dumps(result) + '\n')
+            stdout.flush()
+            written += len(batch)
+            batch = []
+            deadline = None
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score NDJSON requests from stdin in micro-batches.")
+    parser.add_argument('--batch-size', type=int, default=256, help="Maximum records per micro-batch")
+    parser.add_argument('--flush-interval', type=float, default=0.05,
+                        help="Maximum seconds a record waits before its batch is scored")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.flush_interval < 0:
+        parser.error("--batch-size must be >= 1 and --flush-interval must be >= 0")
+
+    run(load_models(), sys.stdin, sys.stdout, args.batch_size, args.flush_interval)
+
+
+if __name__ == '__main__':
+    main()